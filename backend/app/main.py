@@ -1,33 +1,268 @@
+# 실행 (저장소 루트에서): uvicorn backend.app.main:app --port 8001
+import time
 
-from fastapi import FastAPI
+_IMPORT_START = time.perf_counter()
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import sys
-from pathlib import Path
 
-# 프로젝트 루트 디렉토리를 sys.path 경로에 추가
-sys.path.append(str(Path(__file__).resolve().parents[2]))
+from frontend.graph import (
+    CheckpointingDisabled, ThreadTopicMismatch, astream_debate, debate_latency, get_graph, regenerate_report, run_debate,
+    run_debate_batch, warmup,
+)
+from frontend.utils import query_cache_stats
+from frontend.jobs import JobQueue
+from frontend import metrics
+
+IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 1)  # 이 모듈 import에 걸린 시간
+
+# 동시에 진행할 수 있는 토론 수 (초과 요청은 자리가 날 때까지 대기)
+MAX_CONCURRENT_DEBATES = int(os.getenv("MAX_CONCURRENT_DEBATES", "16"))
+# /debates/batch 한 번에 받을 수 있는 주제 수
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+async def _warmup(app: FastAPI, started: float):
+    """벡터 저장소/클라이언트/토크나이저 예열 (끝나면 /readyz 가 200)"""
+    report = await asyncio.to_thread(warmup)
+    report["import_ms"] = IMPORT_MS
+    report["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    app.state.startup = report
+    logger.info("startup %s", json.dumps(report, ensure_ascii=False))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # 그래프는 기동 시 한 번만 compile 해서 모든 요청이 공유
+    app.state.graph = get_graph()
+    app.state.debate_slots = asyncio.Semaphore(MAX_CONCURRENT_DEBATES)
+    app.state.startup = None
+    app.state.warmup_task = asyncio.create_task(_warmup(app, started))
+    app.state.jobs = JobQueue(run_job)
+    await app.state.jobs.start()
+    yield
+    await app.state.jobs.stop()
+    app.state.warmup_task.cancel()
 
-# 이제 frontend.graph를 임포트할 수 있습니다.
-from frontend.graph import build_graph
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+metrics.register_callback_gauge(
+    "query_embedding_cache_hits", "질의 임베딩 캐시 적중 수", lambda: query_cache_stats()["hits"])
+metrics.register_callback_gauge(
+    "query_embedding_cache_misses", "질의 임베딩 캐시 미스 수", lambda: query_cache_stats()["misses"])
+metrics.register_callback_gauge(
+    "debate_jobs_queued", "대기 중인 토론 작업 수", lambda: app.state.jobs.stats()["queued"])
+metrics.register_callback_gauge(
+    "api_startup_milliseconds", "기동(import 제외)부터 warmup 완료까지 걸린 시간", lambda: app.state.startup["startup_ms"])
+metrics.register_callback_gauge(
+    "debate_jobs_deduplicated", "진행 중 작업에 합쳐진 제출 수", lambda: app.state.jobs.stats()["deduplicated"])
 
 class DebateRequest(BaseModel):
     topic: str
+    rounds: Optional[int] = None  # 반박 라운드 수 (없으면 DEBATE_ROUNDS)
+    thread_id: Optional[str] = None  # 체크포인트 키 (같은 id로 다시 요청하면 끝난 단계부터 재개)
+
+@asynccontextmanager
+async def debate_slot():
+    """동시 토론 수 상한 + 진행 중 토론 gauge"""
+    async with app.state.debate_slots:
+        metrics.DEBATES_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            metrics.DEBATES_IN_FLIGHT.dec()
 
 @app.post("/debate")
-def debate(req: DebateRequest):
-    graph = build_graph()
-    state = {
+async def debate(req: DebateRequest):
+    request_id = uuid.uuid4().hex
+    thread_id = req.thread_id or request_id
+    try:
+        async with debate_slot():
+            state = await run_debate(req.topic, app.state.graph, req.rounds, thread_id)
+    except ThreadTopicMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        metrics.DEBATES_TOTAL.inc(endpoint="debate", status="error")
+        metrics.log_trace(request_id, "debate", "error", {"topic": req.topic}, error=str(e))
+        raise
+
+    latency = debate_latency(state)
+    metrics.DEBATES_TOTAL.inc(endpoint="debate", status="ok")
+    metrics.log_trace(request_id, "debate", "ok", state, latency)
+    return {
         "topic": req.topic,
-        "plan": None,
-        "retrieved_docs": [],
-        "prosecution": [],
-        "defense": [],
-        "judge": None,
-        "final_report": None,
+        "thread_id": thread_id,
+        "final_report": state["final_report"],
+        "latency": latency,
+        "token_usage": state.get("token_usage", {}),
     }
 
-    for step in graph.stream(state):
-        pass  # 중간결과는 무시, 최종 state만 리턴
 
-    return {"topic": req.topic, "final_report": state["final_report"]}
+def _sse(event: dict) -> str:
+    """이벤트 dict → Server-Sent Events 한 블록"""
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.post("/debate/stream")
+async def debate_stream(req: DebateRequest):
+    request_id = uuid.uuid4().hex
+    thread_id = req.thread_id or request_id
+
+    async def events():
+        async with debate_slot():
+            try:
+                async for event in astream_debate(req.topic, app.state.graph, req.rounds, thread_id):
+                    if event["event"] == "done":
+                        event["thread_id"] = thread_id
+                        metrics.DEBATES_TOTAL.inc(endpoint="debate_stream", status="ok")
+                        metrics.log_trace(request_id, "debate_stream", "ok",
+                                          {"topic": req.topic, "token_usage": event["token_usage"]}, event["latency"])
+                    yield _sse(event)
+            except Exception as e:
+                metrics.DEBATES_TOTAL.inc(endpoint="debate_stream", status="error")
+                metrics.log_trace(request_id, "debate_stream", "error", {"topic": req.topic}, error=str(e))
+                yield _sse({"event": "error", "message": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class DebateBatchRequest(BaseModel):
+    topics: List[str]
+    rounds: Optional[int] = None
+
+@app.post("/debates/batch")
+async def debates_batch(req: DebateBatchRequest):
+    """
+    여러 주제 토론 → SSE로 끝나는 순서대로 result/error 이벤트, 마지막에 done
+    (질의 임베딩 1회 + 검색 동시 실행, 토론마다 debate_slot 자리를 잡고 LLM 호출은 공유 LLM_CONCURRENCY 풀에서)
+    """
+    if not req.topics:
+        raise HTTPException(status_code=422, detail="topics가 비어 있습니다")
+    if len(req.topics) > BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=422, detail=f"topics는 최대 {BATCH_MAX_TOPICS}개")
+    thread_ids = [uuid.uuid4().hex for _ in req.topics]
+
+    async def events():
+        start = time.perf_counter()
+        counts = {"ok": 0, "error": 0}
+        try:
+            async for i, state, error in run_debate_batch(req.topics, app.state.graph, req.rounds, thread_ids,
+                                                          slot=debate_slot):
+                topic, thread_id = req.topics[i], thread_ids[i]
+                if error is not None:
+                    counts["error"] += 1
+                    metrics.DEBATES_TOTAL.inc(endpoint="debates_batch", status="error")
+                    metrics.log_trace(thread_id, "debates_batch", "error", {"topic": topic}, error=str(error))
+                    yield _sse({"event": "error", "index": i, "topic": topic, "thread_id": thread_id,
+                                "message": str(error)})
+                    continue
+                latency = debate_latency(state)
+                counts["ok"] += 1
+                metrics.DEBATES_TOTAL.inc(endpoint="debates_batch", status="ok")
+                metrics.log_trace(thread_id, "debates_batch", "ok", state, latency)
+                yield _sse({
+                    "event": "result",
+                    "index": i,
+                    "topic": topic,
+                    "thread_id": thread_id,
+                    "final_report": state["final_report"],
+                    "latency": latency,
+                    "token_usage": state.get("token_usage", {}),
+                })
+        except Exception as e:  # 묶음 검색 실패 등 배치 전체 오류
+            yield _sse({"event": "error", "message": str(e)})
+        yield _sse({"event": "done", "count": len(req.topics), **counts,
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def run_job(topic: str, rounds: Optional[int], thread_id: str):
+    """작업 큐 워커가 실행하는 토론 (진행 이벤트를 그대로 넘김, 요청에 thread_id가 없으면 job id = 체크포인트 thread id)"""
+    request_id = uuid.uuid4().hex
+    async with debate_slot():
+        try:
+            async for event in astream_debate(topic, app.state.graph, rounds, thread_id):
+                if event["event"] == "done":
+                    metrics.DEBATES_TOTAL.inc(endpoint="jobs", status="ok")
+                    metrics.log_trace(request_id, "jobs", "ok",
+                                      {"topic": topic, "token_usage": event["token_usage"]}, event["latency"])
+                yield event
+        except Exception as e:
+            metrics.DEBATES_TOTAL.inc(endpoint="jobs", status="error")
+            metrics.log_trace(request_id, "jobs", "error", {"topic": topic}, error=str(e))
+            raise
+
+@app.post("/jobs", status_code=202)
+async def submit_job(req: DebateRequest):
+    """토론 작업 제출 → job id (같은 주제·설정·thread_id가 진행 중이면 그 작업 id)"""
+    job, deduplicated = app.state.jobs.submit(req.topic, req.rounds, req.thread_id)
+    return {"job_id": job["id"], "thread_id": job["thread_id"], "status": job["status"], "deduplicated": deduplicated}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """작업 상태/진행/결과"""
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    job.pop("key", None)
+    return job
+
+
+@app.post("/debate/{thread_id}/report")
+async def regenerate(thread_id: str):
+    """끝난 토론의 최종 보고서만 다시 생성 (앞 단계 LLM 호출 없음)"""
+    try:
+        async with debate_slot():
+            state = await regenerate_report(thread_id, app.state.graph)
+    except CheckpointingDisabled as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="재생성할 체크포인트가 없습니다")
+    return {
+        "topic": state["topic"],
+        "thread_id": thread_id,
+        "final_report": state["final_report"],
+        "token_usage": state.get("token_usage", {}),
+    }
+
+
+@app.get("/healthz")
+def healthz():
+    """프로세스 생존 확인 (의존성 확인 없음)"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """warmup이 끝나고 필수 단계(LLM 클라이언트/벡터 저장소/그래프…)가 성공했을 때만 200"""
+    report = app.state.startup
+    if report is None:
+        return JSONResponse({"status": "starting", "import_ms": IMPORT_MS}, status_code=503)
+    return JSONResponse({"status": "ready" if report["ready"] else "not_ready", **report},
+                        status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus 텍스트 형식 지표"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,110 @@
+# fakes.py
+# 목적:
+#   Azure 호출 없이 성능을 재기 위한 결정적(deterministic) 가짜 LLM/임베딩.
+#   - FakeChatModel : 첫 토큰 지연(ttft) + 초당 토큰 수로 스트리밍 응답을 흉내
+#   - FakeEmbeddings: 글자 bigram 해싱 벡터 (같은 텍스트 → 같은 벡터, 비슷한 텍스트 → 가까운 벡터)
+
+import asyncio
+import hashlib
+import math
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+VOCAB = (
+    "헌법 생명권 판례 억지효과 오판 가능성 피해자 유족 국제 인권 규약 대체형벌 "
+    "종신형 법질서 정책 효과 반론 근거 출처 요약 권고 결론 한계 추가 검토"
+).split()
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+class FakeChatModel(BaseChatModel):
+    """프롬프트 해시로 정해지는 답변을 지연/토큰 속도에 맞춰 흘려보내는 가짜 챗 모델"""
+
+    deployment_name: str = "fake-chat"
+    temperature: float = 0.3
+    ttft_s: float = 0.3            # 첫 토큰까지 지연
+    tokens_per_s: float = 80.0     # 토큰 생성 속도
+    output_tokens: int = 120       # 응답 토큰 수
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        seed = _seed("\n".join(str(m.content) for m in messages))
+        tokens = []
+        for _ in range(self.output_tokens):
+            seed = (seed * 6364136223846793005 + 1442695040888963407) % 2 ** 64  # LCG
+            tokens.append(VOCAB[(seed >> 33) % len(VOCAB)] + " ")
+        return tokens
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.ttft_s + len(tokens) / self.tokens_per_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.ttft_s)
+        for tok in self._tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=tok))
+            time.sleep(1 / self.tokens_per_s)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.ttft_s + len(tokens) / self.tokens_per_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.ttft_s)
+        for tok in self._tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=tok))
+            await asyncio.sleep(1 / self.tokens_per_s)
+
+
+class FakeEmbeddings(Embeddings):
+    """글자 bigram 해싱 임베딩 + 호출당 지연"""
+
+    def __init__(self, dim: int = 256, latency_s: float = 0.05, per_text_s: float = 0.0):
+        self.dim = dim
+        self.latency_s = latency_s
+        self.per_text_s = per_text_s
+        self.calls = 0
+
+    def vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        text = " ".join(text.split())
+        for i in range(max(1, len(text) - 1)):
+            h = _seed(text[i:i + 2])
+            vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return [x / norm for x in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency_s + self.per_text_s * len(texts))
+        return [self.vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency_s + self.per_text_s * len(texts))
+        return [self.vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,364 @@
+# run_bench.py
+# 목적:
+#   Azure 호출 없이(가짜 LLM/임베딩) 성능을 측정해 JSON 파일로 남긴다.
+#   - 노드별 지연 / 토론 1회 end-to-end 지연
+#   - backend/app/main.py 의 /debate 에 N개 클라이언트가 동시에 요청할 때 처리량
+#   - ingest.py 경로(분할 → 임베딩 → Chroma 기록)의 초당 청크 처리량
+#   - 벡터 검색 백엔드(Chroma vs FAISS flat/ivf/hnsw)의 기동 시간, 메모리(RSS), 인덱스 파일 매핑 여부, 질의 지연, recall
+#
+# 사용 (저장소 루트에서):
+#   python -m bench.run_bench --clients 1,8,32 --out bench_results.json
+
+import argparse
+import asyncio
+import gc
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+FRONTEND_DIR = ROOT / "frontend"
+
+# Azure 클라이언트 생성이 실패하지 않도록 더미 값 (실제 호출은 가짜 모델로 대체)
+for _key, _value in {
+    "AOAI_ENDPOINT": "https://bench.invalid/",
+    "AOAI_API_KEY": "bench",
+    "AOAI_DEPLOY_GPT4O_MINI": "fake-chat",
+    "AOAI_DEPLOY_EMBED_3_SMALL": "fake-embed",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+sys.path.insert(0, str(ROOT))
+
+import httpx
+from langchain_core.documents import Document
+
+from bench.fakes import FakeChatModel, FakeEmbeddings
+from frontend import graph, retrieval, utils
+
+TOPICS = [
+    "사형제도 유지 vs 폐지",
+    "노란봉투법 도입 찬반",
+    "혐오표현 규제 vs 표현의 자유",
+    "영장주의 예외 확대 여부",
+]
+
+
+# -----------------------------
+# 공통 헬퍼
+# -----------------------------
+def summarize(values: List[float]) -> Dict[str, float]:
+    """평균/중앙값/p95/최대"""
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def import_ingest():
+    """frontend/ingest.py (frontend/ 안에서 실행되는 스크립트) 불러오기"""
+    sys.path.insert(0, str(FRONTEND_DIR))
+    import ingest
+    return ingest
+
+def import_api():
+    """backend/app/main.py 불러오기"""
+    spec = importlib.util.spec_from_file_location("debate_api", ROOT / "backend" / "app" / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def load_corpus(copies: int = 1) -> List[Document]:
+    """frontend/data 문서를 copies배로 복제 (사본마다 내용이 달라 임베딩 캐시/중복 제거에 걸리지 않음)"""
+    docs = []
+    for path in sorted((FRONTEND_DIR / "data").glob("*.txt")):
+        text = path.read_text(encoding="utf-8")
+        for i in range(copies):
+            body = "\n".join(f"[사본 {i}] {line}" if line.strip() else line for line in text.splitlines())
+            docs.append(Document(page_content=body, metadata={"source": f"copy{i}/{path.name}"}))
+    return docs
+
+def rss_kb() -> Dict[str, int]:
+    """현재 프로세스 RSS (KB). RssAnon=프로세스 전용, RssFile=파일 매핑(mmap, 프로세스 간 공유 가능) — Linux 전용"""
+    out = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    key, value = line.split(":")
+                    out[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return out
+
+def install_fakes(llm: FakeChatModel, embeddings: FakeEmbeddings, vdb_dir: str):
+    """graph/utils 가 가짜 LLM/임베딩과 임시 벡터 DB를 쓰도록 교체"""
+    graph.llm = llm
+    graph._graph = None
+    utils.VDB_DIR = vdb_dir
+    utils.get_embeddings = lambda: embeddings
+    for fn in (utils.get_query_embeddings, utils.get_vectorstore, utils.get_retriever,
+               retrieval.get_vector_store, retrieval.get_lexical_index):
+        fn.cache_clear()
+
+
+# -----------------------------
+# 측정
+# -----------------------------
+def bench_ingest(embeddings: FakeEmbeddings, copies: int, batch_size: int, concurrency: int, out_dir: str) -> dict:
+    """분할 → 임베딩 → Chroma 기록 처리량"""
+    ingest = import_ingest()
+    from embeddings import CachedEmbeddings
+
+    docs = load_corpus(copies)
+    t0 = time.perf_counter()
+    texts, metas = ingest.build_payload(docs)
+    t1 = time.perf_counter()
+    embedder = CachedEmbeddings(embeddings, "fake-embed", cache=None, batch_size=batch_size, max_concurrency=concurrency)
+    vectors = embedder.embed_documents(texts)
+    t2 = time.perf_counter()
+    ingest.build_chroma(texts, metas, vectors, [], out_dir)
+    ingest.BM25Index(texts, metas).save(out_dir)
+    t3 = time.perf_counter()
+
+    return {
+        "documents": len(docs),
+        "chunks": len(texts),
+        "embed_calls": embedder.stats["calls"],
+        "split_s": round(t1 - t0, 3),
+        "embed_s": round(t2 - t1, 3),
+        "write_s": round(t3 - t2, 3),
+        "total_s": round(t3 - t0, 3),
+        "chunks_per_s": round(len(texts) / (t3 - t0), 1),
+    }
+
+_STARTUP_PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import backend.app.main as api
+import_ms = (time.perf_counter() - t0) * 1000
+
+async def run():
+    async with api.app.router.lifespan_context(api.app):
+        await api.app.state.warmup_task
+        return api.app.state.startup
+
+report = asyncio.run(run())
+report["process_import_ms"] = round(import_ms, 1)
+print(json.dumps(report))
+"""
+
+def bench_startup(vdb_dir: str, top: int = 10) -> dict:
+    """새 프로세스에서 API 모듈 import + warmup 시간 (python -X importtime 으로 느린 import도 함께)"""
+    env = {"AOAI_ENDPOINT": "https://bench.invalid", "AOAI_API_KEY": "bench", "AOAI_DEPLOY_GPT4O_MINI": "bench",
+           "AOAI_DEPLOY_EMBED_3_SMALL": "bench", **os.environ,
+           "STARTUP_WARM_QUERY": "0", "PYTHONPATH": str(ROOT)}  # 네트워크 호출 없이 클라이언트만 생성
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _STARTUP_PROBE],
+                          cwd=os.path.dirname(vdb_dir), env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:]}
+
+    imports = []  # "import time: self [us] | cumulative | imported package" 중 최상위 패키지만
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  ") and cumulative.strip().isdigit():
+                imports.append((name.strip(), int(cumulative.strip()) / 1000))
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    report["process_wall_ms"] = round(wall * 1000, 1)
+    report["slowest_imports_ms"] = {n: round(ms, 1) for n, ms in sorted(imports, key=lambda x: -x[1])[:top]}
+    return report
+
+def bench_backends(embeddings: FakeEmbeddings, copies: int, n_queries: int, out_dir: str, k: int = 3) -> dict:
+    """
+    벡터 검색 백엔드별 기동 시간(열기 + 첫 질의), RSS 증가량, 질의 지연, flat 대비 recall@k.
+    index_mapped=False 인 faiss 행은 인덱스가 힙(RssAnon)에 올라간 것 → 워커 간 공유되지 않음
+    """
+    from frontend.faiss_store import FAISS_INDEX_TYPES, index_file_mapped, load_faiss
+
+    ingest = import_ingest()
+    texts, metas = ingest.build_payload(load_corpus(copies))
+    vectors = [embeddings.vector(t) for t in texts]
+    queries = [embeddings.vector(texts[i][:80]) for i in range(0, len(texts), max(1, len(texts) // n_queries))]
+
+    chroma_dir = os.path.join(out_dir, "chroma")
+    ingest.build_chroma(texts, metas, vectors, [], chroma_dir)
+    openers = {"chroma": lambda: utils.Chroma(collection_name=utils.COLLECTION_NAME, persist_directory=chroma_dir,
+                                              embedding_function=embeddings)}
+    index_files = {}
+    for kind in FAISS_INDEX_TYPES:
+        faiss_dir = os.path.join(out_dir, f"faiss_{kind}", "faiss_index")
+        ingest.build_faiss(texts, metas, vectors, [], os.path.dirname(faiss_dir), kind)
+        openers[f"faiss_{kind}"] = lambda d=faiss_dir: load_faiss(d, embeddings)
+        index_files[f"faiss_{kind}"] = os.path.join(faiss_dir, "index.faiss")
+
+    results, baseline = {"chunks": len(texts), "queries": len(queries)}, None
+    for name, opener in openers.items():
+        gc.collect()
+        before = rss_kb()
+        start = time.perf_counter()
+        store = opener()
+        store.similarity_search_by_vector(queries[0], k=k)  # Chroma는 첫 질의 때 인덱스를 올림
+        startup = time.perf_counter() - start
+        after = rss_kb()
+
+        latencies, hits = [], []
+        for q in queries:
+            t = time.perf_counter()
+            docs = store.similarity_search_by_vector(q, k=k)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits.append({d.metadata.get("id") for d in docs})
+        if name == "faiss_flat":
+            baseline = hits
+        results[name] = {
+            "startup_ms": round(startup * 1000, 1),
+            "rss_anon_kb": after.get("RssAnon", 0) - before.get("RssAnon", 0),
+            "rss_file_kb": after.get("RssFile", 0) - before.get("RssFile", 0),
+            "query_ms": summarize(latencies),
+            "index_mapped": index_file_mapped(index_files[name]) if name in index_files else None,
+            "_hits": hits,
+        }
+        del store
+
+    for name, r in results.items():  # 정확 검색(flat) 대비 recall@k
+        if isinstance(r, dict) and "_hits" in r:
+            hits = r.pop("_hits")
+            r[f"recall@{k}_vs_flat"] = round(statistics.fmean(
+                len(h & b) / max(1, len(b)) for h, b in zip(hits, baseline)), 3)
+    return results
+
+async def bench_debates(n: int, rounds: int = 1) -> dict:
+    """토론 n회를 순서대로 실행 → 노드별/전체 지연(ms)"""
+    nodes: Dict[str, List[float]] = {}
+    wall, critical = [], []
+    for i in range(n):
+        state = await graph.run_debate(TOPICS[i % len(TOPICS)], rounds=rounds)
+        latency = graph.debate_latency(state)
+        for node, ms in latency["nodes_ms"].items():
+            nodes.setdefault(node, []).append(ms)
+        wall.append(latency["wall_ms"])
+        critical.append(latency["critical_path_ms"])
+    return {
+        "debates": n,
+        "rounds": rounds,
+        "node_ms": {node: summarize(v) for node, v in nodes.items()},
+        "end_to_end_ms": summarize(wall),
+        "critical_path_ms": summarize(critical),
+    }
+
+async def bench_api(clients: List[int], per_client: int) -> dict:
+    """/debate 동시 요청 처리량 (ASGI 직접 호출, 네트워크 제외)"""
+    api = import_api()
+    results = {}
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for n in clients:
+                latencies = []
+
+                async def worker(i: int):
+                    for j in range(per_client):
+                        start = time.perf_counter()
+                        res = await client.post("/debate", json={"topic": TOPICS[(i + j) % len(TOPICS)]})
+                        res.raise_for_status()
+                        latencies.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(worker(i) for i in range(n)))
+                elapsed = time.perf_counter() - start
+                results[str(n)] = {
+                    "requests": n * per_client,
+                    "wall_s": round(elapsed, 3),
+                    "throughput_rps": round(n * per_client / elapsed, 2),
+                    "latency_ms": summarize(latencies),
+                }
+    return results
+
+
+# -----------------------------
+# 엔트리포인트
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 성능 벤치마크 (가짜 LLM/임베딩)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="가짜 LLM 첫 토큰 지연(초)")
+    parser.add_argument("--tokens-per-s", type=float, default=80.0, help="가짜 LLM 초당 토큰 수")
+    parser.add_argument("--output-tokens", type=int, default=120, help="가짜 LLM 응답 토큰 수")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="가짜 임베딩 호출당 지연(초)")
+    parser.add_argument("--debates", type=int, default=5, help="노드 지연 측정용 순차 토론 수")
+    parser.add_argument("--rounds", type=int, default=1, help="토론당 반박 라운드 수")
+    parser.add_argument("--clients", default="1,8,32", help="동시 클라이언트 수 목록 (쉼표 구분)")
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    parser.add_argument("--ingest-copies", type=int, default=50, help="ingest 측정용 코퍼스 복제 배수")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--backend-copies", type=int, default=50, help="백엔드 비교용 코퍼스 복제 배수")
+    parser.add_argument("--backend-queries", type=int, default=200, help="백엔드 비교용 질의 수")
+    parser.add_argument("--skip", default="", help="건너뛸 측정 (nodes,api,ingest,backends,startup)")
+    parser.add_argument("--out", default="bench_results.json", help="결과 JSON 경로")
+    args = parser.parse_args()
+    skip = set(filter(None, args.skip.split(",")))
+
+    llm = FakeChatModel(ttft_s=args.ttft, tokens_per_s=args.tokens_per_s, output_tokens=args.output_tokens)
+    embeddings = FakeEmbeddings(latency_s=args.embed_latency)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vdb_dir = os.path.join(tmp, "vectordb")
+        print(" 벤치용 벡터 DB 준비 중…")
+        bench_ingest(embeddings, 1, args.batch_size, args.concurrency, vdb_dir)  # 토론용 인덱스 (측정값은 버림)
+        install_fakes(llm, embeddings, vdb_dir)
+
+        if "ingest" not in skip:
+            print(" ingest 처리량 측정 중…")
+            results["ingest"] = bench_ingest(embeddings, args.ingest_copies, args.batch_size, args.concurrency,
+                                             os.path.join(tmp, "ingest_bench"))
+        if "startup" not in skip:
+            print(" API 콜드 스타트 측정 중…")
+            results["startup"] = bench_startup(vdb_dir)
+        if "backends" not in skip:
+            print(" 벡터 검색 백엔드 비교 중…")
+            results["backends"] = bench_backends(embeddings, args.backend_copies, args.backend_queries,
+                                                 os.path.join(tmp, "backends"))
+        if "nodes" not in skip:
+            print(" 노드별 지연 측정 중…")
+            results["debate"] = asyncio.run(bench_debates(args.debates, args.rounds))
+        if "api" not in skip:
+            print(" /debate 동시 처리량 측정 중…")
+            clients = [int(c) for c in args.clients.split(",") if c]
+            results["api"] = asyncio.run(bench_api(clients, args.requests_per_client))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": git_rev(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f" 결과 저장 → {args.out}💖")
+
+
+if __name__ == "__main__":
+    main()
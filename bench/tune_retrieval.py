@@ -0,0 +1,178 @@
+# tune_retrieval.py
+# 목적:
+#   청크 크기/오버랩/k/검색 방식(similarity vs MMR) 조합별 검색 품질과 비용을 오프라인으로 비교한다.
+#   - 임베딩은 bench.fakes.FakeEmbeddings(글자 bigram 해싱, 지연 0) → Azure 호출 없이 결정적인 결과
+#   - 라벨: bench/retrieval_questions.json ({"question", "evidence"}) — evidence 문구를 포함한 청크가 정답
+#     (청크 경계와 무관한 라벨이라 chunk 설정이 달라도 같은 질문셋으로 비교 가능)
+#   - 지표: recall@k(정답 청크가 상위 k 안에 있는 질문 비율), MRR, 인덱스 생성 시간, 인덱스 크기, 질의 지연
+#
+# 사용 (저장소 루트에서):
+#   python -m bench.tune_retrieval --chunk-sizes 300,500,1000 --overlaps 50,100,150 --ks 3,5 --out tune_results.json
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from bench.fakes import FakeEmbeddings
+from bench.run_bench import git_rev, load_corpus, summarize
+
+QUESTIONS_PATH = Path(__file__).with_name("retrieval_questions.json")
+SEARCH_TYPES = ("similarity", "mmr")
+MMR_FETCH_K = 20
+
+# 지금 코드에 흩어져 있는 설정 (결과 표에서 표시): (chunk_size, overlap, k, search_type, lambda_mult)
+CURRENT_SETTINGS = {
+    (1000, 150, 3, "similarity", None): "frontend/ingest.py + utils.get_retriever",
+    (500, 100, 5, "mmr", 0.7): "practice/Section3/ragAgent.py",
+}
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+def load_questions(path: Path = QUESTIONS_PATH) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, name)) for d, _, files in os.walk(path) for name in files)
+
+
+def build_index(docs: List[Document], chunk_size: int, overlap: int, embeddings, backend: str, out_dir: str):
+    """분할 → 임베딩 → 인덱스 저장 → (vectorstore, 청크 수, 생성 시간 s, 크기 bytes)"""
+    start = time.perf_counter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap, length_function=len)
+    chunks = splitter.split_documents(docs)
+    if backend == "faiss":
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.from_documents(chunks, embeddings)
+        store.save_local(out_dir)
+    else:
+        from langchain_chroma import Chroma
+        store = Chroma.from_documents(chunks, embeddings, persist_directory=out_dir,
+                                      collection_name=f"tune_{chunk_size}_{overlap}")
+    return store, len(chunks), time.perf_counter() - start, dir_size(out_dir)
+
+
+def search(store, query: str, k: int, search_type: str, lambda_mult: float) -> List[Document]:
+    if search_type == "mmr":
+        return store.max_marginal_relevance_search(query, k=k, fetch_k=max(k, MMR_FETCH_K), lambda_mult=lambda_mult)
+    return store.similarity_search(query, k=k)
+
+
+def score(store, questions: List[dict], k: int, search_type: str, lambda_mult: float) -> dict:
+    """질문셋 전체 → recall@k, MRR, 질의 지연(ms)"""
+    hits, rr, latencies = 0, 0.0, []
+    for q in questions:
+        start = time.perf_counter()
+        docs = search(store, q["question"], k, search_type, lambda_mult)
+        latencies.append((time.perf_counter() - start) * 1000)
+        evidence = _norm(q["evidence"])
+        rank = next((i + 1 for i, d in enumerate(docs) if evidence in _norm(d.page_content)), None)
+        if rank:
+            hits += 1
+            rr += 1 / rank
+    n = len(questions) or 1
+    return {"recall_at_k": round(hits / n, 3), "mrr": round(rr / n, 3), "query_ms": summarize(latencies)}
+
+
+def run_grid(docs: List[Document], questions: List[dict], chunk_sizes: List[int], overlaps: List[int],
+             ks: List[int], search_types: List[str], lambdas: List[float], backend: str) -> List[dict]:
+    embeddings = FakeEmbeddings(latency_s=0.0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunk_size, overlap in itertools.product(chunk_sizes, overlaps):
+            if overlap >= chunk_size:
+                continue
+            out_dir = os.path.join(tmp, f"{chunk_size}_{overlap}")
+            store, n_chunks, build_s, size = build_index(docs, chunk_size, overlap, embeddings, backend, out_dir)
+            print(f" chunk {chunk_size}/{overlap}: {n_chunks}개 청크, {build_s:.2f}s")
+            for k, search_type in itertools.product(ks, search_types):
+                for lambda_mult in (lambdas if search_type == "mmr" else [None]):
+                    row = {
+                        "chunk_size": chunk_size,
+                        "chunk_overlap": overlap,
+                        "k": k,
+                        "search_type": search_type,
+                        "lambda_mult": lambda_mult,
+                        "chunks": n_chunks,
+                        "build_s": round(build_s, 3),
+                        "index_bytes": size,
+                        **score(store, questions, k, search_type, lambda_mult),
+                    }
+                    used_by = CURRENT_SETTINGS.get((chunk_size, overlap, k, search_type, row["lambda_mult"]))
+                    if used_by:
+                        row["used_by"] = used_by
+                    rows.append(row)
+    return rows
+
+
+def print_table(rows: List[dict], top: int):
+    """품질(recall, MRR) 내림차순 → 같으면 p50 질의 지연 오름차순"""
+    ordered = sorted(rows, key=lambda r: (-r["recall_at_k"], -r["mrr"], r["query_ms"].get("p50", 0)))
+    print(f"\n{'size':>5} {'ovl':>4} {'k':>2} {'search':<10} {'λ':>4} {'recall':>6} {'mrr':>5} "
+          f"{'p50ms':>6} {'build_s':>7} {'KB':>6}  used_by")
+    for r in ordered[:top]:
+        lam = f"{r['lambda_mult']:.1f}" if r["lambda_mult"] is not None else "-"
+        print(f"{r['chunk_size']:>5} {r['chunk_overlap']:>4} {r['k']:>2} {r['search_type']:<10} {lam:>4} "
+              f"{r['recall_at_k']:>6.3f} {r['mrr']:>5.3f} {r['query_ms'].get('p50', 0):>6.2f} "
+              f"{r['build_s']:>7.2f} {r['index_bytes'] // 1024:>6}  {r.get('used_by', '')}")
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="청크/검색 설정별 검색 품질·지연 비교 (가짜 임베딩)")
+    parser.add_argument("--chunk-sizes", default="300,500,1000")
+    parser.add_argument("--overlaps", default="50,100,150")
+    parser.add_argument("--ks", default="3,5")
+    parser.add_argument("--search-types", default=",".join(SEARCH_TYPES))
+    parser.add_argument("--lambdas", default="0.5,0.7", help="MMR lambda_mult 목록")
+    parser.add_argument("--backend", choices=("faiss", "chroma"), default="faiss")
+    parser.add_argument("--copies", type=int, default=1, help="코퍼스 복제 배수 (지연/크기 측정용)")
+    parser.add_argument("--questions", default=str(QUESTIONS_PATH), help="라벨 질문셋 JSON")
+    parser.add_argument("--top", type=int, default=20, help="표에 출력할 상위 조합 수")
+    parser.add_argument("--out", default="tune_results.json", help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    search_types = [s for s in args.search_types.split(",") if s]
+    unknown = set(search_types) - set(SEARCH_TYPES)
+    if unknown:
+        parser.error(f"알 수 없는 search type: {', '.join(sorted(unknown))} ({' | '.join(SEARCH_TYPES)})")
+
+    questions = load_questions(Path(args.questions))
+    docs = load_corpus(args.copies)
+    rows = run_grid(docs, questions, _ints(args.chunk_sizes), _ints(args.overlaps), _ints(args.ks),
+                    search_types, [float(v) for v in args.lambdas.split(",") if v], args.backend)
+    print_table(rows, args.top)
+
+    report: Dict = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": git_rev(),
+        "config": vars(args),
+        "questions": len(questions),
+        "results": rows,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n 결과 저장 → {args.out}💖")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,88 @@
 # app.py
+import json
+import os
+
 import streamlit as st
 import requests
 
+API_URL = os.getenv("DEBATE_API_URL", "http://localhost:8001")
+
+# 노드 이름 → 화면에 보일 제목
+NODE_TITLES = {
+    "planner": "🗂️ 토론 계획",
+    "retriever": "📚 참고 문서",
+    "role_retriever": "📚 역할별 참고 문서",
+    "prosecution": "👨‍💼 검사",
+    "defense": "👩‍💼 변호사",
+    "summarize": "🧾 라운드 요약",
+    "judge": "🧑‍⚖️ 판사",
+    "writer": "📝 최종 보고서",
+}
+# summarize 노드는 양측 요약을 동시에 생성 → token 이벤트의 node가 "summarize:<측>"으로 나뉘어 옴
+SUMMARY_SIDES = {"prosecution": "검사 요약", "defense": "변호사 요약"}
+
+
+def iter_sse(res):
+    """text/event-stream 응답을 이벤트(dict) 단위로 읽기"""
+    data = []
+    for line in res.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith("data:"):
+                data.append(line[5:].strip())
+            continue
+        if data:
+            yield json.loads("\n".join(data))
+        data = []
+
+
+def render_output(node, output):
+    """node_end 이벤트의 결과를 텍스트로 변환"""
+    if node in ("retriever", "role_retriever"):
+        return "\n\n".join(f"- ({d['source']}) {d['content'][:300]}" for d in output or [])
+    return output or ""
+
+
 st.set_page_config(page_title="AI 법률 에이전트", layout="wide")
 st.title("⚖️ AI 법률 에이전트 (FastAPI) 💖")
 
 topic = st.text_input("토론 주제를 입력하세요:", "예시 : 사형제도 유지 vs 폐지")
+rounds = st.number_input("반박 라운드 수", min_value=1, max_value=5, value=1)
 
 if st.button("토론 시작"):
-    with st.spinner("토론 진행 중..."):
-        res = requests.post("http://localhost:8001/debate", json={"topic": topic})
-        if res.status_code == 200:
-            result = res.json()
-            st.success("토론 완료")
-            st.subheader("최종 보고서")
-            st.write(result["final_report"])
-        else:
+    status = st.status("토론 진행 중...", expanded=True)
+    boxes, texts = {}, {}
+
+    with requests.post(f"{API_URL}/debate/stream", json={"topic": topic, "rounds": int(rounds)}, stream=True) as res:
+        if res.status_code != 200:
+            status.update(label="API 호출 실패", state="error")
             st.error(f"API 호출 실패: {res.status_code}")
+        else:
+            res.encoding = "utf-8"
+            for event in iter_sse(res):
+                kind, node = event["event"], event.get("node")
+
+                if kind == "node_start":
+                    title = NODE_TITLES.get(node, node)
+                    if rounds > 1 and node in ("prosecution", "defense", "summarize"):
+                        title += f" (라운드 {event['round']})"
+                    status.write(f"{title} 진행 중…")
+                    st.subheader(title)
+                    if node == "summarize":  # 측마다 자기 칸 (두 요약이 글자 단위로 섞이지 않게)
+                        for side, label in SUMMARY_SIDES.items():
+                            st.markdown(f"**{label}**")
+                            boxes[f"{node}:{side}"], texts[f"{node}:{side}"] = st.empty(), ""
+                    else:
+                        boxes[node], texts[node] = st.empty(), ""
+                elif kind == "token" and node in boxes:
+                    texts[node] += event["text"]
+                    boxes[node].markdown(texts[node])
+                elif kind == "node_end" and node == "summarize":
+                    for side in SUMMARY_SIDES:
+                        boxes[f"{node}:{side}"].markdown((event["output"] or {}).get(side) or "")
+                elif kind == "node_end" and node in boxes:
+                    boxes[node].markdown(render_output(node, event["output"]))
+                elif kind == "done":
+                    status.update(label="토론 완료", state="complete", expanded=False)
+                elif kind == "error":
+                    status.update(label="토론 실패", state="error")
+                    st.error(f"토론 중 오류: {event['message']}")
@@ -0,0 +1,254 @@
+# checkpoints.py
+# 목적:
+#   LangGraph 체크포인트를 SQLite에 저장해, 토론(thread id 단위)이 중간에 실패해도
+#   이미 끝난 노드(planner/retriever/검사/변호사…)의 LLM 호출을 다시 하지 않고 이어서 실행한다.
+#   - 같은 thread id로 다시 요청 → 마지막으로 끝난 단계부터 재개 (끝난 토론이면 저장된 결과 반환)
+#   - "최종 보고서만 다시 생성" → writer 직전 체크포인트에서 갈라져 writer만 재실행
+#   - 정리: 끝난 thread는 최근 CHECKPOINT_KEEP개(+그 부모)만 남기고, CHECKPOINT_TTL 지난 thread는 삭제
+#   langgraph-checkpoint 의 BaseCheckpointSaver 구현 (별도 sqlite saver 패키지 불필요)
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+# -----------------------------
+# 전역 설정값
+# -----------------------------
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "off")        # off | sqlite
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "3"))           # 끝난 thread당 남길 최근 체크포인트 수
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(7 * 86400)))  # 초, 마지막 갱신 후 이 시간이 지나면 thread 삭제
+CHECKPOINT_EVICT_EVERY = 200                                       # put N회마다 만료 thread 정리
+
+
+def _ids(config: RunnableConfig) -> Tuple[str, str, Optional[str]]:
+    conf = config["configurable"]
+    return conf["thread_id"], conf.get("checkpoint_ns", ""), conf.get("checkpoint_id")
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """체크포인트(전체 state 포함)와 노드별 pending write를 SQLite 두 테이블에 저장"""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, keep: int = CHECKPOINT_KEEP, ttl: int = CHECKPOINT_TTL):
+        super().__init__()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.keep = keep
+        self.ttl = ttl
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT,"
+                " type TEXT,"
+                " checkpoint BLOB,"
+                " metadata_type TEXT,"
+                " metadata BLOB,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " type TEXT,"
+                " value BLOB,"
+                " task_path TEXT,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at)")
+            self._conn.commit()
+
+    # -----------------------------
+    # 조회
+    # -----------------------------
+    def _tuple(self, row) -> CheckpointTuple:
+        thread_id, ns, cid, parent, type_, blob, meta_type, meta_blob = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, ns, cid),
+            ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": cid}},
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((meta_type, meta_blob)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent}}
+                if parent else None
+            ),
+            pending_writes=[(task, channel, self.serde.loads_typed((t, v))) for task, channel, t, v in writes],
+        )
+
+    _COLUMNS = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+                " type, checkpoint, metadata_type, metadata FROM checkpoints")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns, cid = _ids(config)
+        with self._lock:
+            if cid:
+                row = self._conn.execute(
+                    self._COLUMNS + " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, ns, cid),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    self._COLUMNS + " WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, ns),
+                ).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            thread_id, ns, cid = _ids(config)
+            where += ["thread_id = ?", "checkpoint_ns = ?"]
+            params += [thread_id, ns]
+            if cid:
+                where.append("checkpoint_id = ?")
+                params.append(cid)
+        if before:
+            where.append("checkpoint_id < ?")
+            params.append(_ids(before)[2])
+        sql = self._COLUMNS + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        count = 0
+        for row in rows:
+            item = self._tuple(row)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    # -----------------------------
+    # 기록
+    # -----------------------------
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id, ns, parent = _ids(config)
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        meta_type, meta_blob = self.serde.dumps_typed(metadata)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, checkpoint["id"], parent, type_, blob, meta_type, meta_blob, time.time()),
+            )
+            self._conn.commit()
+            self._puts += 1
+        if self._puts % CHECKPOINT_EVICT_EVERY == 0:
+            self.evict()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id, ns, cid = _ids(config)
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, ns, cid, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+        # 오류/인터럽트 같은 특수 채널은 덮어쓰고, 일반 write는 처음 것만 유지
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    # async 버전: 동기 구현을 스레드에서 실행 (superstep마다의 commit이 다른 토론의 이벤트 루프를 막지 않도록)
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # -----------------------------
+    # 정리
+    # -----------------------------
+    def compact(self, thread_id: str) -> int:
+        """끝난 thread: 최근 keep개 체크포인트와 그 부모(보고서 재생성용 writer 직전 단계)만 남김"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_checkpoint_id FROM checkpoints"
+                " WHERE thread_id = ? ORDER BY checkpoint_id DESC", (thread_id,),
+            ).fetchall()
+            keep = {(ns, cid) for ns, cid, _ in rows[:self.keep]}
+            keep |= {(ns, parent) for ns, _, parent in rows[:self.keep] if parent}
+            drop = [(ns, cid) for ns, cid, _ in rows if (ns, cid) not in keep]
+            for ns, cid in drop:
+                args = (thread_id, ns, cid)
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", args)
+                self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", args)
+            self._conn.commit()
+        return len(drop)
+
+    def evict(self) -> int:
+        """마지막 체크포인트가 ttl보다 오래된 thread 전체 삭제"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            threads = [r[0] for r in self._conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,))]
+            for thread_id in threads:
+                self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+        return len(threads)
+
+
+@lru_cache(maxsize=1)
+def get_checkpointer() -> Optional[SQLiteCheckpointSaver]:
+    """환경변수 설정대로 만든 체크포인터 (꺼져 있으면 None)"""
+    if CHECKPOINT_BACKEND == "sqlite":
+        return SQLiteCheckpointSaver()
+    if CHECKPOINT_BACKEND == "off":
+        return None
+    raise ValueError(f"알 수 없는 CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND} (off | sqlite)")
@@ -0,0 +1,103 @@
+# dedup.py
+# 목적:
+#   임베딩 전에 거의 같은 청크(법률 가이드·판결문의 반복 문구, CHUNK_OVERLAP으로 겹친 부분 등)를 걸러낸다.
+#   - MinHash(글자 n-gram, mmh3) 서명 + LSH 밴딩으로 후보를 넉넉히 찾고(임계값에서 99% 이상), 서명으로 추정한 Jaccard 유사도가 임계값 이상이면 중복
+#   - 먼저 나온 청크를 대표로 남기고, 버린 청크는 대표 청크의 alias(출처/해시/ID/토큰 수)로 기록
+#   - 청크를 하나씩 넣는 방식이라 build_payload와 --stream 양쪽에서 같은 결과
+
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import mmh3
+import numpy as np
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))  # 추정 Jaccard 유사도 (0이면 끔)
+DEDUP_NUM_PERM = 128   # MinHash 서명 길이
+DEDUP_NGRAM = 5        # 글자 shingle 길이
+DEDUP_LSH_RECALL = 0.99  # 임계값 유사도의 쌍이 LSH 후보가 될 최소 확률
+_PRIME = (1 << 61) - 1
+
+
+def lsh_params(threshold: float, num_perm: int, recall: float = DEDUP_LSH_RECALL) -> Tuple[int, int]:
+    """
+    (밴드 수 b, 밴드당 행 수 r), b·r ≤ num_perm.
+    임계값 유사도의 쌍이 후보가 될 확률 1-(1-t^r)^b 가 recall 이상인 조합 중 r이 가장 큰 것
+    (S-curve 중간점 (1/b)^(1/r)이 임계값보다 충분히 아래 → 놓치는 중복이 거의 없음, 늘어난 후보는 서명 비교로 걸러냄)
+    """
+    best = (num_perm, 1)
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        if 1 - (1 - threshold ** r) ** b >= recall:
+            best = (b, r)
+    return best
+
+
+class MinHasher:
+    """글자 n-gram shingle → num_perm개 해시 함수의 최솟값 서명"""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, ngram: int = DEDUP_NGRAM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.ngram = ngram
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        text = " ".join(text.split())
+        if len(text) <= self.ngram:
+            return {text}
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        h = np.fromiter((mmh3.hash(s, signed=False) for s in self.shingles(text)), dtype=np.uint64)
+        return ((np.outer(self.a, h) + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    청크를 순서대로 add() → 이미 본 청크와 거의 같으면 그 대표 청크의 ID를 돌려줌.
+    aliases: {대표 ID: [{"source", "chunk_hash", "id", "tokens"}, ...]}
+    stats  : {"chunks", "duplicates", "duplicate_tokens"}
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM, ngram: int = DEDUP_NGRAM,
+                 count_tokens: Callable[[List[str]], int] = None):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, ngram)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.count_tokens = count_tokens
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.aliases: Dict[str, List[dict]] = {}
+        self.stats = {"chunks": 0, "duplicates": 0, "duplicate_tokens": 0}
+
+    def _bands(self, sig: np.ndarray):
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows].tobytes()
+
+    def add(self, text: str, meta: dict) -> Optional[str]:
+        """meta: {"source", "chunk_hash", "id"} → 중복이면 대표 청크 ID, 아니면 None (대표로 등록)"""
+        self.stats["chunks"] += 1
+        sig = self.hasher.signature(text)
+
+        seen = set()
+        for band in self._bands(sig):
+            for key in self.buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if float(np.mean(self.signatures[key] == sig)) >= self.threshold:
+                    tokens = self.count_tokens([text]) if self.count_tokens else 0
+                    self.aliases.setdefault(key, []).append({**meta, "tokens": tokens})
+                    self.stats["duplicates"] += 1
+                    self.stats["duplicate_tokens"] += tokens
+                    return key
+
+        self.signatures[meta["id"]] = sig
+        for band in self._bands(sig):
+            self.buckets.setdefault(band, []).append(meta["id"])
+        return None
+
+
+def alias_sources(aliases: List[dict]) -> str:
+    """Chroma 메타데이터용 (리스트 불가) — alias 출처를 쉼표로 이은 문자열"""
+    return ",".join(sorted({a["source"] for a in aliases}))
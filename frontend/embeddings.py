@@ -0,0 +1,171 @@
+# embeddings.py
+# 목적:
+#   AzureOpenAIEmbeddings를 감싸서
+#   - (배포명, 청크 해시) 키의 SQLite 디스크 캐시 (재빌드/청크 실험/FAISS·Chroma 동시 빌드 시 재사용)
+#   - 배치 크기 조절
+#   - 동시 요청 수 제한 + 429(Rate limit) 지수 백오프
+#   를 제공하는 임베딩 계층.
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from manifest import chunk_hash
+
+# -----------------------------
+# 전역 설정값
+# -----------------------------
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".cache/embeddings.sqlite")  # --rebuild로 지워지지 않도록 vectordb/ 밖에 둔다
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))        # 요청 1회당 청크 수
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))  # 동시에 보내는 요청 수
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))        # 429 재시도 횟수
+
+
+def _is_rate_limited(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 429
+
+
+def _retry_after(e: Exception) -> float:
+    """응답 헤더의 Retry-After(초) 값, 없으면 0"""
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+# -----------------------------
+# SQLite 벡터 캐시
+# -----------------------------
+class EmbeddingCache:
+    """(deployment, chunk_hash) → float32 벡터 를 저장하는 SQLite 캐시"""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " deployment TEXT NOT NULL,"
+                " chunk_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (deployment, chunk_hash))"
+            )
+            self._conn.commit()
+
+    def get_many(self, deployment: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):  # SQLite 변수 개수 제한 대비
+                part = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE deployment = ? AND chunk_hash IN ({','.join('?' * len(part))})",
+                    [deployment, *part],
+                )
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, deployment: str, items: List[Tuple[str, List[float]]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (deployment, chunk_hash, vector) VALUES (?, ?, ?)",
+                [(deployment, h, array("f", vec).tobytes()) for h, vec in items],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# -----------------------------
+# 캐시 + 배치 + 동시성 임베딩 래퍼
+# -----------------------------
+class CachedEmbeddings(Embeddings):
+    """
+    문서 임베딩은 캐시를 먼저 보고, 미스만 batch_size 단위로 나눠
+    최대 max_concurrency 개의 요청을 동시에 보낸다. 429는 지수 백오프로 재시도.
+    질의 임베딩(embed_query)은 그대로 통과.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        deployment: str,
+        cache: EmbeddingCache = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        max_retries: int = EMBED_MAX_RETRIES,
+        count_tokens=None,
+    ):
+        self.embeddings = embeddings
+        self.deployment = deployment or "default"
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.count_tokens = count_tokens or (lambda texts: sum(len(t) for t in texts))
+        self.stats = {"calls": 0, "tokens": 0, "cache_hits": 0, "cache_misses": 0, "retries": 0}
+        self._lock = threading.Lock()
+
+    def _bump(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """배치 1개 임베딩 (429면 Retry-After 또는 지수 백오프 후 재시도)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                vectors = self.embeddings.embed_documents(batch)
+                self._bump("calls")
+                self._bump("tokens", self.count_tokens(batch))
+                return vectors
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._bump("retries")
+                delay = _retry_after(e) or min(60.0, 2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay * 0.25))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [chunk_hash(t) for t in texts]
+        found = self.cache.get_many(self.deployment, set(hashes)) if self.cache else {}
+
+        # 캐시에 없는 청크만 (같은 내용은 한 번만) 임베딩
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, t)
+        self._bump("cache_hits", len(texts) - sum(1 for h in hashes if h not in found))
+        self._bump("cache_misses", len(missing))
+
+        if missing:
+            miss_hashes = list(missing)
+            miss_texts = [missing[h] for h in miss_hashes]
+            batches = [miss_texts[i:i + self.batch_size] for i in range(0, len(miss_texts), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                vectors = [v for part in pool.map(self._embed_batch, batches) for v in part]
+            fresh = list(zip(miss_hashes, vectors))
+            if self.cache:
+                self.cache.put_many(self.deployment, fresh)
+            found.update(fresh)
+
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
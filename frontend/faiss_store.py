@@ -0,0 +1,115 @@
+# faiss_store.py
+# 목적:
+#   ingest.py가 만든 FAISS 인덱스(vectordb/faiss_backup/faiss_index)를 검색 백엔드로 쓰기 위한 도구.
+#   - 인덱스 종류: flat(정확, 기준값) | ivf(IVF-Flat, 대규모) | hnsw(HNSW-Flat, 대규모·저지연)
+#   - 로드는 memory-mapped: IO_FLAG_MMAP_IFC(flat/hnsw 벡터 코드) | IO_FLAG_MMAP(ivf 역리스트)
+#     → 벡터가 프로세스 힙이 아니라 파일 매핑에 있어 여러 API 워커 프로세스가 같은 페이지 캐시를 공유
+#     (IO_FLAG_MMAP 만으로는 ivf 역리스트만 매핑되고 flat/hnsw는 워커마다 힙에 통째로 복사됨.
+#      hnsw 그래프 이웃 목록은 매핑 여부가 빌드에 따라 다름 → 로드 후 /proc/self/maps 로 확인)
+#   파일 형식은 LangChain FAISS.save_local 과 같음 (index.faiss + index.pkl)
+
+import logging
+import math
+import os
+import pickle
+from typing import List, Optional, Sequence
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+FAISS_INDEX_TYPES = ("flat", "ivf", "hnsw")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "8"))            # ivf: 검색할 클러스터 수
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))           # hnsw: 노드당 이웃 수
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))     # hnsw: 검색 후보 폭
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+
+# IO_FLAG_MMAP_IFC 가 없는 오래된 faiss 빌드면 ivf 역리스트만 매핑됨
+FAISS_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+logger = logging.getLogger(__name__)
+
+
+def ivf_nlist(n: int) -> int:
+    """IVF 클러스터 수: 약 4·√n (학습에 클러스터당 39개 이상 필요 → 작은 코퍼스는 줄임)"""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def make_ann_index(vectors: Sequence[Sequence[float]], index_type: str):
+    """
+    벡터 → FAISS 인덱스 (L2 거리, LangChain FAISS 기본값과 같음).
+    벡터를 넣은 순서가 곧 내부 번호이므로 index_to_docstore_id 매핑이 그대로 유지된다.
+    """
+    if index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f"알 수 없는 FAISS 인덱스 종류: {index_type} ({' | '.join(FAISS_INDEX_TYPES)})")
+    xb = np.asarray(vectors, dtype="float32")
+    d = xb.shape[1]
+
+    if index_type == "ivf":
+        quantizer = faiss.IndexFlatL2(d)
+        index = faiss.IndexIVFFlat(quantizer, d, ivf_nlist(len(xb)))
+        index.train(xb)
+        index.nprobe = FAISS_NPROBE
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_EF_CONSTRUCTION
+        index.hnsw.efSearch = FAISS_EF_SEARCH
+    else:
+        index = faiss.IndexFlatL2(d)
+    index.add(xb)
+    return index
+
+
+def index_vectors(index) -> List[List[float]]:
+    """flat 인덱스에 저장된 벡터 전부 (내부 번호 순)"""
+    return index.reconstruct_n(0, index.ntotal).tolist()
+
+
+def index_type_of(index) -> str:
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def index_file_mapped(index_file: str) -> Optional[bool]:
+    """인덱스 파일이 이 프로세스에 memory-mapped 되어 있는지 (/proc/self/maps 기준, Linux 외에서는 None)"""
+    target = os.path.realpath(index_file)
+    try:
+        with open("/proc/self/maps") as f:
+            return any(line.rstrip("\n").endswith(" " + target) for line in f)
+    except OSError:
+        return None
+
+
+def load_faiss(path: str, embeddings: Embeddings, mmap: bool = True) -> FAISS:
+    """
+    save_local 로 저장된 인덱스를 memory-mapped 로 읽어 LangChain FAISS 스토어로 감싼다.
+    (mmap을 지원하지 않는 인덱스/빌드면 일반 로드로 대체, 매핑되지 않았으면 경고)
+    """
+    index_file = os.path.join(path, "index.faiss")
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(index_file, FAISS_MMAP_FLAGS)
+        except RuntimeError as e:
+            logger.warning("FAISS mmap 로드 실패 → 일반 로드로 대체: %s", e)
+        else:
+            if index_file_mapped(index_file) is False:
+                logger.warning("FAISS 인덱스가 파일 매핑되지 않음 → 워커마다 힙에 전체 복사 (%s, faiss %s)",
+                               index_type_of(index), faiss.__version__)
+    if index is None:
+        index = faiss.read_index(index_file)
+
+    kind = index_type_of(index)
+    if kind == "ivf":
+        faiss.extract_index_ivf(index).nprobe = FAISS_NPROBE
+    elif kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = FAISS_EF_SEARCH
+
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)  # ingest.py가 직접 만든 파일만 읽음
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
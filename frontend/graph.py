@@ -1,109 +1,654 @@
 # graph.py
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import operator
 import os
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END
+import time
+from typing import Dict, Any, AsyncContextManager, AsyncIterator, Callable, List, Optional, Tuple
+from typing_extensions import Annotated, TypedDict
+from langgraph.graph import StateGraph, START, END
 from langchain_openai import AzureChatOpenAI
-from frontend.utils import get_retriever
+from frontend.retrieval import (
+    RETRIEVAL_K, RETRIEVAL_MODE, fuse, get_lexical_index, get_vector_store, retrieve, retrieve_many,
+)
+from frontend.llm_cache import get_response_cache
+from frontend.checkpoints import get_checkpointer
+from frontend.prompt_builder import build_prompt, token_len
+from frontend import metrics
 from frontend.prompts import (
     planner_prompt,
     prosecution_prompt,
     defense_prompt,
+    prosecution_rebuttal_prompt,
+    defense_rebuttal_prompt,
+    summary_prompt,
     judge_prompt,
     writer_prompt,
 )
 
+# 반박 라운드 수 (요청에서 rounds를 주지 않았을 때)
+DEBATE_ROUNDS = int(os.getenv("DEBATE_ROUNDS", "1"))
+MAX_DEBATE_ROUNDS = int(os.getenv("MAX_DEBATE_ROUNDS", "5"))
+SUMMARY_MAX_CHARS = int(os.getenv("DEBATE_SUMMARY_MAX_CHARS", "600"))  # 누적 요약 길이 상한
+
+
+STARTUP_WARM_QUERY = os.getenv("STARTUP_WARM_QUERY", "1") == "1"  # 기동 시 검색 1회로 임베딩 연결/인덱스까지 예열
+# 프로세스 전체에서 동시에 나가는 LLM 호출 수 (모든 토론·배치가 공유, 쿼터에 맞춰 조정)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "32"))
+# 역할별 검색: planner JSON의 역할별 points로 질의를 만들어 검사/변호사/판사가 각자 근거를 받음
+# (주제 검색은 planner와 동시에, 역할별 검색만 plan을 기다림 → 검사 발언 앞에 planner 호출 + 역할 검색 1회가 옴.
+#  0이면 주제 1회 검색 + planner를 검사 발언과 동시에 실행)
+ROLE_RETRIEVAL = os.getenv("ROLE_RETRIEVAL", "1") == "1"
+ROLE_QUERY_POINTS = int(os.getenv("ROLE_QUERY_POINTS", "3"))  # 역할당 검색 질의로 쓰는 point 수
+PLAN_ROLES = {"검사": "prosecution", "변호사": "defense", "판사": "judge"}  # planner JSON의 role → 노드
+
 
 # -----------------------------
-# LLM 초기화
+# LLM 초기화 (import 시점이 아니라 처음 쓸 때/기동 warmup 때)
 # -----------------------------
-llm = AzureChatOpenAI(
-    azure_endpoint=os.getenv("AOAI_ENDPOINT"),
-    api_key=os.getenv("AOAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION", "2024-05-01-preview"),
-    deployment_name=os.getenv("AOAI_DEPLOY_GPT4O_MINI"),
-    temperature=0.3,
-)
+llm = None
+
+def get_llm() -> AzureChatOpenAI:
+    global llm
+    if llm is None:
+        llm = AzureChatOpenAI(
+            azure_endpoint=os.getenv("AOAI_ENDPOINT"),
+            api_key=os.getenv("AOAI_API_KEY"),
+            api_version=os.getenv("OPENAI_API_VERSION", "2024-05-01-preview"),
+            deployment_name=os.getenv("AOAI_DEPLOY_GPT4O_MINI"),
+            temperature=0.3,
+        )
+    return llm
+
+
+logger = logging.getLogger(__name__)
+
+
+# 보고서 재생성처럼 "같은 프롬프트로 새 답"이 필요할 때 응답 캐시를 건너뜀 (노드 task로 전파됨)
+_bypass_cache: contextvars.ContextVar = contextvars.ContextVar("bypass_llm_cache", default=False)
+# 배치 실행에서 미리 묶어 검색한 주제 문서 (있으면 retriever 노드는 주제 검색을 건너뜀)
+_prefetched_docs: contextvars.ContextVar = contextvars.ContextVar("prefetched_docs", default=None)
+
+_llm_slots: Dict[Any, asyncio.Semaphore] = {}
+
+def llm_slots() -> asyncio.Semaphore:
+    """LLM 호출 동시성 상한 (이벤트 루프마다 하나)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _llm_slots:
+        _llm_slots.clear()  # 이전 루프(asyncio.run 반복 실행)의 세마포어는 버림
+        _llm_slots[loop] = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _llm_slots[loop]
+
+async def generate(node: str, prompt: str, prompt_tokens: int = None,
+                   stream_node: str = None) -> Tuple[str, Dict[str, int]]:
+    """
+    LLM 호출 (응답 캐시가 켜져 있고 해당 노드가 대상이면 캐시 먼저 확인).
+    stream_node: 한 노드 안에서 LLM을 동시에 여러 번 부를 때 token 이벤트를 구분하는 이름 (없으면 노드 이름)
+    반환: (응답 텍스트, {"prompt": 프롬프트 토큰, "completion": 응답 토큰, "cached": 0/1})
+    """
+    if prompt_tokens is None:
+        prompt_tokens = token_len(prompt)
+    cache = None if _bypass_cache.get() else get_response_cache()
+    model = get_llm()
+    deployment, temperature = model.deployment_name, model.temperature
+
+    cached = await cache.alookup(node, deployment, temperature, prompt) if cache is not None else None
+    if cached is not None:
+        usage = {"prompt": prompt_tokens, "completion": token_len(cached), "cached": 1}
+    else:
+        async with llm_slots():
+            res = await model.ainvoke(prompt, {"metadata": {"stream_node": stream_node}} if stream_node else None)
+        meta = getattr(res, "usage_metadata", None) or {}
+        usage = {
+            "prompt": meta.get("input_tokens") or prompt_tokens,
+            "completion": meta.get("output_tokens") or token_len(res.content),
+            "cached": 0,
+        }
+        cached = res.content
+        if cache is not None:
+            await cache.astore(node, deployment, temperature, prompt, cached)
+
+    logger.info("node=%s prompt_tokens=%d completion_tokens=%d cached=%d",
+                node, usage["prompt"], usage["completion"], usage["cached"])
+    metrics.LLM_CALLS.inc(node=node, cached=usage["cached"])
+    if not usage["cached"]:
+        metrics.LLM_TOKENS.inc(usage["prompt"], node=node, kind="prompt")
+        metrics.LLM_TOKENS.inc(usage["completion"], node=node, kind="completion")
+    return cached, usage
 
 
 # -----------------------------
 # 상태 정의
 # -----------------------------
-def init_state() -> Dict[str, Any]:
+def merge_timings(left: Dict[str, Dict[str, float]], right: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """노드 timings reducer: 라운드마다 다시 실행되는 노드는 첫 시작/마지막 종료/누적 실행 시간으로 합침"""
+    out = dict(left or {})
+    for name, t in (right or {}).items():
+        prev = out.get(name)
+        out[name] = t if prev is None else {
+            "start": min(prev["start"], t["start"]),
+            "end": max(prev["end"], t["end"]),
+            "busy": prev["busy"] + t["busy"],
+        }
+    return out
+
+def sum_counts(left: Dict[str, Dict[str, int]], right: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    """{키: {항목: 수}} 를 항목별로 더하는 reducer (노드별 토큰, 라운드별 통계)"""
+    out = {k: dict(v) for k, v in (left or {}).items()}
+    for key, counts in (right or {}).items():
+        cur = out.setdefault(key, {})
+        for k, v in counts.items():
+            cur[k] = cur.get(k, 0) + v
+    return out
+
+
+class DebateState(TypedDict, total=False):
+    # 노드는 state를 직접 고치지 않고, 바뀐 키만 반환 → reducer가 합친다
+    topic: str
+    plan: Optional[str]
+    retrieved_docs: List[Any]        # 모든 역할 근거의 합집합 (스트리밍/UI용)
+    role_docs: Dict[str, List[Any]]  # 역할별 근거 {"prosecution": [...], "defense": [...], "judge": [...]}
+    rounds: int                      # 반박 라운드 수
+    round: int                       # 현재 라운드 (1부터)
+    prosecution: Annotated[List[str], operator.add]
+    defense: Annotated[List[str], operator.add]
+    pros_summary: str                # 지난 라운드 검사 발언 누적 요약
+    defs_summary: str                # 지난 라운드 변호사 발언 누적 요약
+    judge: Optional[str]
+    final_report: Optional[str]
+    timings: Annotated[Dict[str, Dict[str, float]], merge_timings]  # 노드별 {"start", "end", "busy"} (perf_counter 초)
+    token_usage: Annotated[Dict[str, Dict[str, int]], sum_counts]   # 노드별 {"prompt", "completion", "cached"}
+    round_stats: Annotated[Dict[str, Dict[str, float]], sum_counts]  # 라운드별 {"latency_ms", "prompt_tokens", ...}
+
+
+def init_state(rounds: int = None) -> Dict[str, Any]:
     return {
         "topic": None,
         "plan": None,
         "retrieved_docs": [],
+        "role_docs": {},
+        "rounds": max(1, min(rounds or DEBATE_ROUNDS, MAX_DEBATE_ROUNDS)),
+        "round": 1,
         "prosecution": [],
         "defense": [],
+        "pros_summary": "",
+        "defs_summary": "",
         "judge": None,
         "final_report": None,
+        "timings": {},
+        "token_usage": {},
+        "round_stats": {},
     }
 
 # -----------------------------
 # 노드 함수들
 # -----------------------------
-def planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    prompt = planner_prompt.format(topic=state["topic"])
-    res = llm.invoke(prompt)
-    state["plan"] = res.content
-    return state
-
-def retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    retriever = get_retriever()
-    docs = retriever.get_relevant_documents(state["topic"])
-    state["retrieved_docs"] = docs
-    return state
-
-def prosecution_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    docs_text = "\n".join([d.page_content for d in state["retrieved_docs"][:3]])
-    prompt = prosecution_prompt.format(topic=state["topic"], docs=docs_text)
-    res = llm.invoke(prompt)
-    state["prosecution"].append(res.content)
-    return state
-
-def defense_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    docs_text = "\n".join([d.page_content for d in state["retrieved_docs"][:3]])
-    pros_text = "\n".join(state["prosecution"])
-    prompt = defense_prompt.format(topic=state["topic"], pros=pros_text, docs=docs_text)
-    res = llm.invoke(prompt)
-    state["defense"].append(res.content)
-    return state
-
-def judge_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    docs_text = "\n".join([d.page_content for d in state["retrieved_docs"][:3]])
-    pros_text = "\n".join(state["prosecution"])
-    defs_text = "\n".join(state["defense"])
-    prompt = judge_prompt.format(topic=state["topic"], pros=pros_text, defs=defs_text, docs=docs_text)
-    res = llm.invoke(prompt)
-    state["judge"] = res.content
-    return state
-
-def writer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    pros_text = "\n".join(state["prosecution"])
-    defs_text = "\n".join(state["defense"])
-    prompt = writer_prompt.format(topic=state["topic"], pros=pros_text, defs=defs_text, judge=state["judge"])
-    res = llm.invoke(prompt)
-    state["final_report"] = res.content
-    return state
+def _docs(state: Dict[str, Any], role: str = None) -> List[str]:
+    """검색 순위대로 중복 없는 문서 본문 (역할별 근거가 있으면 그 역할 것)"""
+    docs = (state.get("role_docs") or {}).get(role) or state["retrieved_docs"]
+    return list(dict.fromkeys(d.page_content for d in docs))
+
+def plan_points(plan: Optional[str]) -> Dict[str, List[str]]:
+    """planner 응답 → {"prosecution": [point, ...], ...} (앞뒤 설명/코드블록은 무시, JSON이 아니면 {})"""
+    if not plan:
+        return {}
+    try:
+        data = json.loads(plan[plan.find("{"):plan.rfind("}") + 1])
+    except ValueError:
+        return {}
+    points: Dict[str, List[str]] = {}
+    participants = data.get("participants") if isinstance(data, dict) else None
+    for p in participants if isinstance(participants, list) else []:
+        if not isinstance(p, dict):
+            continue
+        role = next((node for name, node in PLAN_ROLES.items() if name in str(p.get("role", ""))), None)
+        items = p.get("points") if isinstance(p.get("points"), list) else []
+        texts = [str(x).strip() for x in items if str(x).strip()]
+        if role and texts:
+            points[role] = texts[:ROLE_QUERY_POINTS]
+    return points
+
+async def planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    prompt, n = build_prompt("planner", planner_prompt, {"topic": state["topic"]}, {})
+    text, usage = await generate("planner", prompt, n)
+    return {"plan": text, "token_usage": {"planner": usage}}
+
+def _count_docs(docs: List[Any]):
+    metrics.RETRIEVED_DOCS.inc(len(docs))
+    if not docs:
+        metrics.RETRIEVAL_EMPTY.inc()
+
+async def retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """주제 검색 (plan이 필요 없어 planner와 동시에 실행). 배치에서 미리 검색한 문서가 있으면 그대로 사용"""
+    docs = _prefetched_docs.get()
+    if docs is None:
+        start = time.perf_counter()
+        docs = await retrieve(state["topic"])
+        metrics.RETRIEVAL_LATENCY.observe(time.perf_counter() - start, mode=RETRIEVAL_MODE)
+    if not ROLE_RETRIEVAL:  # 역할별 검색을 하면 문서 수는 role_retriever가 셈
+        _count_docs(docs)
+    return {"retrieved_docs": docs}
+
+async def role_retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    역할별 point 질의를 한 번에 검색 (retrieve_many → 질의 임베딩은 embed_documents 1회)
+    → 역할마다 "주제 결과 + 자기 point 결과"를 RRF로 합친 근거. plan이 없으면 모든 역할이 주제 결과를 공유
+    """
+    topic, topic_docs = state["topic"], state["retrieved_docs"]
+    role_queries = {role: [f"{topic} {p}" for p in points] for role, points in plan_points(state.get("plan")).items()}
+    queries = list(dict.fromkeys(q for qs in role_queries.values() for q in qs))  # 역할 간 같은 질의는 한 번만
+    if not queries:
+        _count_docs(topic_docs)
+        return {"retrieved_docs": topic_docs, "role_docs": {}}
+
+    start = time.perf_counter()
+    results = dict(zip(queries, await retrieve_many(queries)))
+    metrics.RETRIEVAL_LATENCY.observe(time.perf_counter() - start, mode=RETRIEVAL_MODE)
+
+    role_docs = {
+        role: fuse([topic_docs] + [results[q] for q in role_queries.get(role, [])], RETRIEVAL_K)
+        for role in PLAN_ROLES.values()
+    }
+    rankings = [topic_docs] + list(role_docs.values())
+    docs = fuse(rankings, sum(len(r) for r in rankings))
+    _count_docs(docs)
+    return {"retrieved_docs": docs, "role_docs": role_docs}
+
+def _summaries(state: Dict[str, Any]) -> Dict[str, List[str]]:
+    return {
+        "pros_summary": [state.get("pros_summary") or "(없음)"],
+        "defs_summary": [state.get("defs_summary") or "(없음)"],
+    }
+
+def _last(items: List[str]) -> List[str]:
+    """직전 라운드 발언만 (이전 라운드는 누적 요약으로 대체)"""
+    return items[-1:]
+
+async def prosecution_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    if state.get("round", 1) == 1:
+        prompt, n = build_prompt("prosecution", prosecution_prompt, {"topic": state["topic"]},
+                                 {"docs": _docs(state, "prosecution")})
+    else:
+        prompt, n = build_prompt("prosecution", prosecution_rebuttal_prompt,
+                                 {"topic": state["topic"], "round": state["round"]},
+                                 {**_summaries(state), "defs": _last(state["defense"]),
+                                  "docs": _docs(state, "prosecution")})
+    text, usage = await generate("prosecution", prompt, n)
+    return {"prosecution": [text], "token_usage": {"prosecution": usage}}
+
+async def defense_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    if state.get("round", 1) == 1:
+        prompt, n = build_prompt("defense", defense_prompt, {"topic": state["topic"]},
+                                 {"pros": _last(state["prosecution"]), "docs": _docs(state, "defense")})
+    else:
+        prompt, n = build_prompt("defense", defense_rebuttal_prompt,
+                                 {"topic": state["topic"], "round": state["round"]},
+                                 {**_summaries(state), "pros": _last(state["prosecution"]),
+                                  "docs": _docs(state, "defense")})
+    text, usage = await generate("defense", prompt, n)
+    return {"defense": [text], "token_usage": {"defense": usage}}
+
+async def summarize_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """방금 끝난 라운드 발언을 양측 누적 요약에 합치고 다음 라운드로"""
+    async def summarize(side: str, role: str, summary: str, args: List[str]):
+        prompt, n = build_prompt("summarize", summary_prompt,
+                                 {"topic": state["topic"], "role": role, "max_chars": SUMMARY_MAX_CHARS},
+                                 {"summary": [summary or "(없음)"], "args": args})
+        return await generate("summarize", prompt, n, stream_node=f"summarize:{side}")
+
+    # 양측 요약은 동시에 생성 → token 이벤트는 "summarize:prosecution" / "summarize:defense"로 나뉨
+    (pros_summary, u1), (defs_summary, u2) = await asyncio.gather(
+        summarize("prosecution", "검사", state.get("pros_summary", ""), _last(state["prosecution"])),
+        summarize("defense", "변호사", state.get("defs_summary", ""), _last(state["defense"])),
+    )
+    usage = {k: u1[k] + u2[k] for k in u1}
+    return {
+        "pros_summary": pros_summary,
+        "defs_summary": defs_summary,
+        "round": state["round"] + 1,
+        "token_usage": {"summarize": usage},
+    }
+
+async def judge_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    prompt, n = build_prompt("judge", judge_prompt, {"topic": state["topic"]},
+                             {**_summaries(state), "pros": _last(state["prosecution"]),
+                              "defs": _last(state["defense"]), "docs": _docs(state, "judge")})
+    text, usage = await generate("judge", prompt, n)
+    return {"judge": text, "token_usage": {"judge": usage}}
+
+async def writer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    prompt, n = build_prompt("writer", writer_prompt, {"topic": state["topic"]},
+                             {**_summaries(state), "pros": _last(state["prosecution"]),
+                              "defs": _last(state["defense"]), "judge": [state["judge"] or ""]})
+    text, usage = await generate("writer", prompt, n)
+    return {"final_report": text, "token_usage": {"writer": usage}}
 
 # -----------------------------
 # Graph 구성
 # -----------------------------
-def build_graph():
-    workflow = StateGraph(dict)
-    workflow.add_node("planner", planner_node)
-    workflow.add_node("retriever", retriever_node)
-    workflow.add_node("prosecution", prosecution_node)
-    workflow.add_node("defense", defense_node)
-    workflow.add_node("judge", judge_node)
-    workflow.add_node("writer", writer_node)
-
-    workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "retriever")
-    workflow.add_edge("retriever", "prosecution")
+# ROLE_RETRIEVAL (기본): 주제 검색(retriever)은 plan이 필요 없으므로 planner와 같은 superstep에서 동시에 실행하고,
+# plan의 역할별 points 검색(role_retriever)만 둘 다 끝나길 기다린다.
+# → 검사 개시 발언까지: max(planner, 주제 검색) + 역할별 검색 (ROLE_RETRIEVAL=0보다 planner 호출 + 검색 1회만큼 늦음)
+#
+#   retriever ─┬─ role_retriever → prosecution → defense ─(라운드 남음)→ summarize → prosecution …
+#   planner  ──┘                                         └(마지막 라운드)→ judge → writer → END
+#
+# ROLE_RETRIEVAL=0: plan을 아래 단계에서 읽지 않으므로 planner는 말단 노드로 두고, 검사 개시 발언과 동시에 실행한다.
+# (LangGraph는 superstep 단위로 동기화되므로, planner를 retriever와 같은 단계에 두면
+#  검사 발언이 planner의 LLM 호출을 기다리게 된다 → retriever 다음 단계에서 fan-out)
+#
+#   retriever ─┬─ planner → END
+#              └─ prosecution → …
+NODES = {
+    "retriever": retriever_node,
+    "planner": planner_node,
+    **({"role_retriever": role_retriever_node} if ROLE_RETRIEVAL else {}),
+    "prosecution": prosecution_node,
+    "defense": defense_node,
+    "summarize": summarize_node,
+    "judge": judge_node,
+    "writer": writer_node,
+}
+# 노드 → 선행 노드 (위상 순서, critical path 계산용. 반복 노드는 누적 실행 시간으로 계산)
+DEPENDENCIES = {
+    **({"retriever": [], "planner": [], "role_retriever": ["retriever", "planner"], "prosecution": ["role_retriever"]}
+       if ROLE_RETRIEVAL else {"retriever": [], "planner": ["retriever"], "prosecution": ["retriever"]}),
+    "defense": ["prosecution"],
+    "summarize": ["defense"],
+    "judge": ["defense", "summarize"],
+    "writer": ["judge"],
+}
+ROUND_NODES = ("prosecution", "defense", "summarize")  # 라운드별 통계에 포함되는 노드
+
+def timed(name: str, fn):
+    """노드 실행 시간을 timings 채널에 기록 (+ 라운드별 통계, 노드 지연/오류 지표)"""
+    @functools.wraps(fn)
+    async def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            update = await fn(state)
+        except Exception:
+            metrics.DEBATE_ERRORS.inc(stage=name)
+            raise
+        end = time.perf_counter()
+        metrics.NODE_LATENCY.observe(end - start, node=name)
+        update["timings"] = {name: {"start": start, "end": end, "busy": end - start}}
+
+        if name in ROUND_NODES:
+            usage = update.get("token_usage", {}).get(name, {})
+            update["round_stats"] = {str(state.get("round", 1)): {
+                "latency_ms": round((end - start) * 1000, 1),
+                "prompt_tokens": usage.get("prompt", 0),
+                "completion_tokens": usage.get("completion", 0),
+            }}
+        return update
+    return wrapper
+
+def next_round(state: Dict[str, Any]) -> str:
+    """변호사 발언 뒤: 라운드가 남았으면 요약 후 재반박, 아니면 판사"""
+    return "summarize" if state.get("round", 1) < state.get("rounds", 1) else "judge"
+
+def build_graph(checkpointer=None):
+    workflow = StateGraph(DebateState)
+    for name, fn in NODES.items():
+        workflow.add_node(name, timed(name, fn))
+
+    workflow.add_edge(START, "retriever")
+    if ROLE_RETRIEVAL:
+        workflow.add_edge(START, "planner")
+        workflow.add_edge(["retriever", "planner"], "role_retriever")  # 둘 다 끝나야 실행
+        workflow.add_edge("role_retriever", "prosecution")
+    else:
+        workflow.add_edge("retriever", "planner")
+        workflow.add_edge("planner", END)
+        workflow.add_edge("retriever", "prosecution")
     workflow.add_edge("prosecution", "defense")
-    workflow.add_edge("defense", "judge")
+    workflow.add_conditional_edges("defense", next_round, {"summarize": "summarize", "judge": "judge"})
+    workflow.add_edge("summarize", "prosecution")
     workflow.add_edge("judge", "writer")
     workflow.add_edge("writer", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+def critical_path(timings: Dict[str, Dict[str, float]]) -> Tuple[float, List[str]]:
+    """측정된 노드 실행 시간 기준으로 DEPENDENCIES 위의 최장 경로(ms, 노드 목록)"""
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    for name, deps in DEPENDENCIES.items():
+        if name not in timings:
+            continue
+        dur = timings[name]["busy"] * 1000
+        prev = max((best[d] for d in deps if d in best), default=(0.0, []), key=lambda b: b[0])
+        best[name] = (prev[0] + dur, prev[1] + [name])
+    return max(best.values(), default=(0.0, []), key=lambda b: b[0])
+
+def debate_latency(state: Dict[str, Any]) -> Dict[str, Any]:
+    """토론 1회의 노드별 실행 시간, 전체 wall time, critical path, 라운드별 통계"""
+    timings = state.get("timings") or {}
+    if not timings:
+        return {}
+    path_ms, path = critical_path(timings)
+    first = min(t["start"] for t in timings.values())
+    last = max(t["end"] for t in timings.values())
+    return {
+        "nodes_ms": {n: round(t["busy"] * 1000, 1) for n, t in timings.items()},
+        "wall_ms": round((last - first) * 1000, 1),
+        "critical_path_ms": round(path_ms, 1),
+        "critical_path": path,
+        "rounds": state.get("round_stats", {}),
+    }
+
+
+# -----------------------------
+# 스트리밍 이벤트
+# -----------------------------
+# 노드 이름 → 해당 노드가 채우는 state 키
+NODE_OUTPUTS = {
+    "planner": "plan",
+    "retriever": "retrieved_docs",
+    "role_retriever": "retrieved_docs",
+    "prosecution": "prosecution",
+    "defense": "defense",
+    "summarize": "summaries",
+    "judge": "judge",
+    "writer": "final_report",
+}
+
+def _serialize(key: str, output: Dict[str, Any]) -> Any:
+    """노드 결과를 JSON으로 보낼 수 있는 형태로 변환"""
+    if key == "summaries":
+        return {"prosecution": output.get("pros_summary"), "defense": output.get("defs_summary")}
+    value = output.get(key)
+    if key == "retrieved_docs":
+        return [{"content": d.page_content, "source": d.metadata.get("source", "unknown")} for d in value]
+    if key in ("prosecution", "defense"):
+        return value[-1] if value else None
+    return value
+
+
+# -----------------------------
+# 실행 헬퍼
+# -----------------------------
+_graph = None
+
+def get_graph():
+    """컴파일된 그래프를 한 번만 만들어 재사용 (요청마다 compile 하지 않음)"""
+    global _graph
+    if _graph is None:
+        _graph = build_graph(get_checkpointer())
+    return _graph
+
+# 기동 warmup 단계 (이름, 함수, 실패하면 not ready 인지)
+WARMUP_STEPS = [
+    ("llm_client", get_llm, True),
+    ("tokenizer", lambda: token_len("warmup"), False),
+    ("vector_store", lambda: get_vector_store(), True),
+    ("lexical_index", get_lexical_index, False),
+    ("response_cache", get_response_cache, True),
+    ("checkpointer", get_checkpointer, True),
+    ("graph", get_graph, True),
+]
+
+def warmup(warm_query: bool = STARTUP_WARM_QUERY) -> Dict[str, Any]:
+    """
+    기동 시 1회: 클라이언트/저장소/토크나이저/그래프를 미리 만들어 첫 요청도 평소 지연으로.
+    반환: {"steps_ms": {단계: ms}, "errors": {단계: 메시지}, "ready": 필수 단계가 모두 성공했는지}
+    """
+    steps = list(WARMUP_STEPS)
+    if warm_query:  # 질의 임베딩 연결 + 벡터 인덱스 적재
+        steps.append(("warm_query", lambda: get_vector_store().similarity_search("warmup", k=1), False))
+
+    report = {"steps_ms": {}, "errors": {}, "ready": True}
+    for name, fn, required in steps:
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning("warmup %s 실패: %s", name, e)
+            report["errors"][name] = str(e)
+            report["ready"] = report["ready"] and not required
+        report["steps_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+class ThreadTopicMismatch(Exception):
+    """이미 다른 주제의 토론에 쓰인 thread_id로 요청함"""
+
+
+class CheckpointingDisabled(RuntimeError):
+    """체크포인트가 꺼져 있어 이전 토론을 다시 열 수 없음"""
+
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+async def _prepare(graph, topic: str, rounds: Optional[int], thread_id: Optional[str]):
+    """
+    실행 입력/설정 결정 → (입력 state 또는 None(재개), config, 이미 끝난 결과 또는 None)
+    - 체크포인터가 없거나 thread_id가 없으면 매번 새 토론
+    - 같은 thread의 체크포인트가 남아 있으면 마지막으로 끝난 단계부터 이어서 실행
+    """
+    state = init_state(rounds)
+    state["topic"] = topic
+    if thread_id is None or graph.checkpointer is None:
+        return state, None, None
+
+    config = thread_config(thread_id)
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values:
+        return state, config, None
+    if snapshot.values.get("topic") != topic:
+        raise ThreadTopicMismatch(f"thread {thread_id}는 다른 주제의 토론입니다")
+    if snapshot.next:
+        return None, config, None   # 실패/중단된 토론 → 재개
+    return None, config, snapshot.values  # 이미 끝난 토론 → 저장된 결과
+
+async def _compact(graph, thread_id: Optional[str]):
+    if thread_id is not None and graph.checkpointer is not None:
+        await asyncio.to_thread(graph.checkpointer.compact, thread_id)
+
+async def run_debate(topic: str, graph=None, rounds: int = None, thread_id: str = None) -> Dict[str, Any]:
+    """토론 1회를 비동기로 실행하고 최종 state를 반환 (thread_id가 있으면 체크포인트에서 재개)"""
+    graph = graph or get_graph()
+    state, config, done = await _prepare(graph, topic, rounds, thread_id)
+    if done is not None:
+        return done
+    result = await graph.ainvoke(state, config)
+    await _compact(graph, thread_id)
+    return result
+
+async def run_debate_batch(topics: List[str], graph=None, rounds: int = None, thread_ids: List[str] = None,
+                           slot: Callable[[], AsyncContextManager] = None,
+                           ) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    여러 주제를 한 번에 실행 → 끝나는 순서대로 (주제 번호, 최종 state 또는 None, 예외 또는 None)
+    - 질의 임베딩은 embed_documents 1회, 벡터/BM25 검색은 동시에 (retrieve_many)
+    - 토론들은 동시에 진행하고 LLM 호출만 공유 풀(LLM_CONCURRENCY)로 제한 → 총 시간은 LLM 처리량이 결정
+    - slot: 토론 1개마다 들어가는 async context manager (API의 동시 토론 수 상한을 단일 토론과 공유)
+    """
+    graph = graph or get_graph()
+    start = time.perf_counter()
+    docs = await retrieve_many(topics)
+    metrics.RETRIEVAL_LATENCY.observe(time.perf_counter() - start, mode=RETRIEVAL_MODE)
+
+    async def one(i: int, topic: str):
+        _prefetched_docs.set(docs[i])  # task마다 context가 따로라 다른 주제에 섞이지 않음
+        try:
+            async with (slot() if slot else contextlib.nullcontext()):
+                return i, await run_debate(topic, graph, rounds, thread_ids[i] if thread_ids else None), None
+        except Exception as e:
+            return i, None, e
+
+    tasks = [asyncio.create_task(one(i, topic)) for i, topic in enumerate(topics)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for task in tasks:  # 클라이언트가 끊기면 남은 토론 취소
+            task.cancel()
+
+async def regenerate_report(thread_id: str, graph=None) -> Dict[str, Any]:
+    """끝난 토론의 최종 보고서만 다시 생성 (writer 직전 체크포인트에서 writer만 재실행, 응답 캐시 무시)"""
+    graph = graph or get_graph()
+    if graph.checkpointer is None:
+        raise CheckpointingDisabled("체크포인트가 꺼져 있습니다 (CHECKPOINT_BACKEND=sqlite)")
+    target = None
+    async for snapshot in graph.aget_state_history(thread_config(thread_id)):
+        if snapshot.next == ("writer",):
+            target = snapshot
+            break
+    if target is None:
+        raise KeyError(thread_id)
+
+    token = _bypass_cache.set(True)
+    try:
+        result = await graph.ainvoke(None, target.config)
+    finally:
+        _bypass_cache.reset(token)
+    await _compact(graph, thread_id)
+    return result
+
+async def astream_debate(topic: str, graph=None, rounds: int = None, thread_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    토론을 실행하면서 진행 이벤트를 순서대로 내보냄.
+    - node_start / node_end : 노드 시작·종료 (라운드 번호, node_end에는 해당 노드의 결과 포함)
+    - token                 : LLM이 생성하는 토큰 (summarize는 "summarize:prosecution" / "summarize:defense")
+    - done                  : 최종 보고서
+    """
+    graph = graph or get_graph()
+    state, config, done = await _prepare(graph, topic, rounds, thread_id)
+    if done is not None:
+        yield _done_event(topic, done)
+        return
+    current_round: Dict[str, int] = {}
+
+    async for ev in graph.astream_events(state, config, version="v2"):
+        kind = ev["event"]
+        node = ev.get("metadata", {}).get("langgraph_node")
+
+        if kind == "on_chat_model_stream":
+            text = ev["data"]["chunk"].content
+            if text:
+                yield {"event": "token", "node": ev["metadata"].get("stream_node") or node, "text": text}
+        elif ev["name"] in NODE_OUTPUTS and node == ev["name"]:
+            if kind == "on_chain_start":
+                current_round[node] = (ev["data"].get("input") or {}).get("round", 1)
+                yield {"event": "node_start", "node": node, "round": current_round[node]}
+            elif kind == "on_chain_end":
+                output = ev["data"].get("output") or {}
+                yield {"event": "node_end", "node": node, "round": current_round.get(node, 1),
+                       "output": _serialize(NODE_OUTPUTS[node], output)}
+        elif kind == "on_chain_end" and not ev.get("parent_ids"):
+            yield _done_event(topic, ev["data"].get("output") or {})
+    await _compact(graph, thread_id)
+
+def _done_event(topic: str, final: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event": "done",
+        "topic": topic,
+        "final_report": final.get("final_report"),
+        "latency": debate_latency(final),
+        "token_usage": final.get("token_usage", {}),
+    }
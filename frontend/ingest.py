@@ -3,25 +3,52 @@
 #   data/ 폴더 안의 PDF/TXT 문서를 읽어 텍스트 청크로 나눈 뒤
 #   Azure OpenAI 임베딩으로 벡터화하여 ChromaDB에 저장.
 #   (--faiss 옵션을 쓰면 FAISS 백업 인덱스도 생성)
+#   각 청크는 딱 한 번만 임베딩하고, 같은 벡터를 Chroma/FAISS 양쪽에 기록한다.
+#   vectordb/manifest.json 과 비교해 새로 생겼거나 바뀐 청크만 임베딩하고,
+#   사라진 청크의 벡터는 삭제한다. (--rebuild 는 전체 재생성)
+#   임베딩 전에 MinHash/LSH로 거의 같은 청크를 걸러 대표 청크의 alias로 기록한다 (--dedup-threshold)
+#   BM25 어휘 색인(vectordb/bm25.json, --stream이면 디스크 색인 bm25.sqlite)도 함께 만든다 (임베딩 불필요, 매번 전체 재생성)
+#   --stream: 파일을 하나씩 여러 프로세스에서 파싱·분할하고, 제한된 큐를 거쳐 배치로 임베딩·기록
+#             → 코퍼스 크기와 무관하게 임베딩 대기 메모리가 일정 (수천 개 PDF용)
 
 import argparse     # 커맨드라인 옵션 파싱
 import os
+import queue
 import shutil
-from typing import List, Tuple
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Set, Tuple
+
+try:
+    import resource  # 최대 RSS 보고용 (Unix)
+except ImportError:
+    resource = None
 
 # LangChain + OpenAI 관련 모듈
+import chromadb
 from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.vectorstores import Chroma, FAISS
+from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # utils.py에서 공통 설정/함수 불러오기
-from utils import load_and_ingest, VDB_DIR, AOAI_ENDPOINT, AOAI_API_KEY, DEPLOY_EMBED
+from utils import (
+    load_documents, load_file, iter_source_files, count_tokens, DATA_DIR,
+    VDB_DIR, COLLECTION_NAME, AOAI_ENDPOINT, AOAI_API_KEY, DEPLOY_EMBED,
+)
+from manifest import chunk_hash, vector_id, load_manifest, save_manifest, diff_manifest
+from lexical import BM25_DB_NAME, BM25_INDEX_NAME, BM25Index, BM25Writer
+from dedup import DEDUP_THRESHOLD, NearDuplicateIndex, alias_sources
+from faiss_store import FAISS_INDEX_TYPES, index_vectors, make_ann_index
+from embeddings import CachedEmbeddings, EmbeddingCache, EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY, EMBED_CACHE_PATH
 
 # -----------------------------
 # 전역 설정값
 # -----------------------------
 CHUNK_SIZE = 1000          # 청크 크기 (문서 잘라내는 단위)
 CHUNK_OVERLAP = 150        # 청크 간 오버랩 (앞뒤 겹치게 해서 맥락 유지)
+STREAM_WORKERS = os.cpu_count() or 1   # --stream: 파싱/분할 프로세스 수
+STREAM_QUEUE_SIZE = 2048               # --stream: 임베딩 대기 청크 상한 (넘으면 파싱 쪽이 기다림)
 
 # -----------------------------
 # 환경변수 체크 & 임베딩 준비
@@ -48,55 +75,293 @@ def get_embeddings() -> AzureOpenAIEmbeddings:
 # -----------------------------
 # 문서 → 청크 → texts/metadatas
 # -----------------------------
-def build_payload() -> Tuple[List[str], List[dict]]:
+def build_payload(docs: list = None, dedup: NearDuplicateIndex = None) -> Tuple[List[str], List[dict]]:
     """
     data/ 폴더에서 문서를 불러와 청크 단위로 분할하고
     텍스트 리스트(texts)와 메타데이터 리스트(metadatas)를 반환.
+    메타데이터에는 source, chunk_hash, id(벡터 ID)가 들어간다.
+    (docs를 넘기면 data/ 대신 그 문서들을 사용 — 벤치마크용)
+    dedup을 넘기면 거의 같은 청크는 빼고 dedup.aliases 에 기록한다.
     """
-    docs = load_and_ingest()  # utils.load_documents: [{"path":..., "content":...}]
+    if docs is None:
+        docs = load_documents()  # utils.load_documents: [Document(page_content, metadata={"source":...})]
     if not docs:
         raise SystemExit("data/ 폴더에 TXT/PDF 문서를 넣어주세요.")
 
     splitter = get_splitter()
-    texts, metas = [], []
-
+    texts, metas, seen = [], [], set()
     for d in docs:
-        chunks = splitter.split_text(d.page_content)
-        for ch in chunks:
-            if not ch.strip():
+        for ch, meta in split_document(d, splitter, seen):
+            if dedup is not None and dedup.add(ch, meta) is not None:
                 continue
             texts.append(ch)
-            metas.append({"source": d.metadata.get("source", "unknown")})
+            metas.append(meta)
 
     if not texts:
         raise SystemExit("문서는 있었지만 유효한 청크를 만들지 못했습니다.")
     return texts, metas
 
 
+def split_document(doc, splitter: RecursiveCharacterTextSplitter, seen: Set[str]) -> Iterator[Tuple[str, dict]]:
+    """Document 1개 → (청크, 메타데이터). seen으로 같은 파일 안의 완전히 같은 청크는 한 번만"""
+    source = doc.metadata.get("source", "unknown")
+    for ch in splitter.split_text(doc.page_content):
+        if not ch.strip():
+            continue
+        c_hash = chunk_hash(ch)
+        vid = vector_id(source, c_hash)
+        if vid in seen:
+            continue
+        seen.add(vid)
+        yield ch, {"source": source, "chunk_hash": c_hash, "id": vid}
+
+
+def split_file(path: str) -> Tuple[str, List[Tuple[str, dict]]]:
+    """(--stream 워커 프로세스) 파일 1개를 페이지 단위로 읽어 분할 → (경로, [(청크, 메타데이터)])"""
+    splitter, seen = get_splitter(), set()
+    return path, [item for doc in load_file(path) for item in split_document(doc, splitter, seen)]
+
+
+def chunk_map(metas: List[dict]) -> Dict[str, Dict[str, str]]:
+    """메타데이터 → manifest용 {source: {chunk_hash: vector_id}}"""
+    files = {}
+    for m in metas:
+        files.setdefault(m["source"], {})[m["chunk_hash"]] = m["id"]
+    return files
+
+
 # -----------------------------
-# Chroma / FAISS 빌더
+# 임베딩 (청크당 1회, 디스크 캐시 + 배치 + 동시 요청)
 # -----------------------------
-def build_chroma(texts: List[str], metas: List[dict], persist_dir: str):
-    """ChromaDB 인덱스 생성 및 저장"""
-    os.makedirs(persist_dir, exist_ok=True)
-    vectordb = Chroma.from_texts(
-        texts=texts,
-        embedding=get_embeddings(),
-        metadatas=metas,
-        persist_directory=persist_dir,
+def get_embedder(batch_size: int = EMBED_BATCH_SIZE, concurrency: int = EMBED_MAX_CONCURRENCY,
+                 cache_path: str = EMBED_CACHE_PATH) -> CachedEmbeddings:
+    """디스크 캐시가 붙은 임베딩 래퍼 (cache_path가 비어 있으면 캐시 없이)"""
+    return CachedEmbeddings(
+        get_embeddings(),
+        deployment=DEPLOY_EMBED,
+        cache=EmbeddingCache(cache_path) if cache_path else None,
+        batch_size=batch_size,
+        max_concurrency=concurrency,
+        count_tokens=count_tokens,
     )
-    vectordb.persist()
 
 
-def build_faiss(texts: List[str], metas: List[dict], faiss_dir: str):
-    """FAISS 인덱스 생성 및 저장 (백업용)"""
+def embed_texts(texts: List[str], embedder: CachedEmbeddings) -> Tuple[List[List[float]], Dict[str, int]]:
+    """
+    청크 임베딩.
+    반환: (벡터 리스트, {"calls": 임베딩 호출 수, "tokens": 임베딩 토큰 수, "cache_hits": ..., ...})
+    """
+    vectors = embedder.embed_documents(texts) if texts else []
+    return vectors, dict(embedder.stats)
+
+
+# -----------------------------
+# Chroma / FAISS 빌더 (이미 계산된 벡터를 기록만 함)
+# -----------------------------
+def open_chroma(persist_dir: str):
+    """Chroma 클라이언트/컬렉션 열기"""
+    os.makedirs(persist_dir, exist_ok=True)
+    client = chromadb.PersistentClient(path=persist_dir)
+    return client, client.get_or_create_collection(COLLECTION_NAME)
+
+
+def build_chroma(texts: List[str], metas: List[dict], vectors: List[List[float]], removed: List[str], persist_dir: str):
+    """새/변경 청크는 upsert, 사라진 청크는 삭제"""
+    client, collection = open_chroma(persist_dir)
+    step = client.get_max_batch_size()
+
+    for i in range(0, len(removed), step):
+        collection.delete(ids=removed[i:i + step])
+    upsert_chroma(client, collection, texts, metas, vectors)
+
+
+def upsert_chroma(client, collection, texts: List[str], metas: List[dict], vectors: List[List[float]]):
+    step = client.get_max_batch_size()
+    for i in range(0, len(texts), step):
+        collection.upsert(
+            ids=[m["id"] for m in metas[i:i + step]],
+            documents=texts[i:i + step],
+            metadatas=metas[i:i + step],
+            embeddings=vectors[i:i + step],
+        )
+
+
+def update_aliases(persist_dir: str, old: Dict[str, List[dict]], new: Dict[str, List[dict]], present: set):
+    """대표 청크의 alias 출처(alias_sources 메타데이터)가 바뀐 것만 갱신 (재임베딩 없음)"""
+    changed = [vid for vid in set(old) | set(new)
+               if vid in present and alias_sources(old.get(vid, [])) != alias_sources(new.get(vid, []))]
+    if not changed:
+        return 0
+    client, collection = open_chroma(persist_dir)
+    step = client.get_max_batch_size()
+    for i in range(0, len(changed), step):
+        ids = changed[i:i + step]
+        collection.update(ids=ids, metadatas=[{"alias_sources": alias_sources(new.get(vid, []))} for vid in ids])
+    return len(changed)
+
+
+def load_chroma_vectors(ids: List[str], persist_dir: str) -> Dict[str, List[float]]:
+    """이미 Chroma에 있는 벡터를 ID로 조회 (재임베딩 없이 FAISS를 채울 때 사용)"""
+    client, collection = open_chroma(persist_dir)
+    step = client.get_max_batch_size()
+    found = {}
+    for i in range(0, len(ids), step):
+        res = collection.get(ids=ids[i:i + step], include=["embeddings"])
+        for vid, vec in zip(res["ids"], res["embeddings"]):
+            found[vid] = [float(x) for x in vec]
+    return found
+
+
+def build_faiss(texts: List[str], metas: List[dict], vectors: List[List[float]], removed: List[str], faiss_dir: str,
+                index_type: str = "flat"):
+    """
+    FAISS 인덱스 생성/갱신 및 저장 (VECTOR_BACKEND=faiss 검색용).
+    기존 인덱스가 있으면 삭제/추가만 반영, 없으면 전달된 청크로 새로 만든다.
+    index_type이 ivf/hnsw면 새로 만들 때 해당 ANN 인덱스로 바꿔 저장 (증분 갱신은 flat만).
+    """
     os.makedirs(faiss_dir, exist_ok=True)
-    index = FAISS.from_texts(
-        texts=texts,
-        embedding=get_embeddings(),
-        metadatas=metas,
-    )
-    index.save_local(os.path.join(faiss_dir, "faiss_index"))
+    path = os.path.join(faiss_dir, "faiss_index")
+    ids = [m["id"] for m in metas]
+
+    if os.path.isdir(path):
+        index = FAISS.load_local(path, get_embeddings(), allow_dangerous_deserialization=True)
+        existing = set(index.index_to_docstore_id.values())
+        stale = [vid for vid in removed if vid in existing]
+        if stale:
+            index.delete(stale)
+        if texts:
+            index.add_embeddings(list(zip(texts, vectors)), metadatas=metas, ids=ids)
+    else:
+        index = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            embedding=get_embeddings(),
+            metadatas=metas,
+            ids=ids,
+        )
+        if index_type != "flat":
+            index.index = make_ann_index(vectors, index_type)
+    index.save_local(path)
+
+
+def build_faiss_from_chroma(persist_dir: str, faiss_dir: str, index_type: str = "flat"):
+    """Chroma에 저장된 청크/벡터를 배치로 읽어 FAISS 인덱스를 새로 만든다 (--stream 용, 재임베딩 없음)"""
+    client, collection = open_chroma(persist_dir)
+    step = client.get_max_batch_size()
+    store = None
+    for offset in range(0, collection.count(), step):
+        res = collection.get(limit=step, offset=offset, include=["documents", "metadatas", "embeddings"])
+        pairs = list(zip(res["documents"], [[float(x) for x in v] for v in res["embeddings"]]))
+        if store is None:
+            store = FAISS.from_embeddings(pairs, get_embeddings(), metadatas=res["metadatas"], ids=res["ids"])
+        else:
+            store.add_embeddings(pairs, metadatas=res["metadatas"], ids=res["ids"])
+    if store is None:
+        return
+    if index_type != "flat":  # ANN 인덱스 학습에는 전체 벡터가 필요
+        store.index = make_ann_index(index_vectors(store.index), index_type)
+    store.save_local(os.path.join(faiss_dir, "faiss_index"))
+
+
+# -----------------------------
+# 스트리밍 ingest (--stream): 대용량 PDF 코퍼스를 일정한 메모리로
+#   파일 목록 → [프로세스 풀] 파싱·분할 → [제한 큐] → [스레드] 배치 임베딩 + Chroma upsert
+# -----------------------------
+_DONE = object()
+
+
+def _embed_worker(q: "queue.Queue", embedder: CachedEmbeddings, persist_dir: str, batch: int,
+                  stats: dict, errors: list, keep: list = None):
+    """큐에서 청크를 batch개씩 꺼내 임베딩하고 바로 Chroma에 기록"""
+    done = False
+    try:
+        client, collection = open_chroma(persist_dir)
+        while not done:
+            items = [q.get()]
+            while len(items) < batch and items[-1] is not _DONE:
+                try:
+                    items.append(q.get(timeout=0.05))
+                except queue.Empty:
+                    break
+            if items[-1] is _DONE:
+                items.pop()
+                done = True
+            if not items:
+                continue
+            texts = [t for t, _ in items]
+            metas = [m for _, m in items]
+            vectors = embedder.embed_documents(texts)
+            upsert_chroma(client, collection, texts, metas, vectors)
+            stats["embedded"] += len(texts)
+            if keep is not None:  # FAISS 증분 갱신용 (새 청크만)
+                keep.append((texts, metas, vectors))
+    except Exception as e:
+        errors.append(e)
+        while not done:  # 파싱 쪽이 put에서 멈추지 않도록 종료 신호까지 비움
+            done = q.get() is _DONE
+
+
+def _put(q: "queue.Queue", item, errors: list):
+    if errors:
+        raise errors[0]
+    q.put(item)
+
+
+def stream_ingest(data_dir: str, persist_dir: str, old_files: Dict[str, Dict[str, str]], embedder: CachedEmbeddings,
+                  workers: int = STREAM_WORKERS, queue_size: int = STREAM_QUEUE_SIZE,
+                  bm25: BM25Writer = None, keep: list = None, dedup: NearDuplicateIndex = None) -> Tuple[Dict[str, Dict[str, str]], List[str], dict]:
+    """
+    파일을 하나씩 흘려보내며 새/변경 청크만 임베딩·기록.
+    메모리에 동시에 올라가는 것은 (진행 중인 파일 2×workers개) + (큐의 청크 queue_size개) 뿐.
+    반환: (manifest용 청크 맵, 삭제할 벡터 ID, {"files", "chunks", "embedded"})
+    """
+    known = {vid for chunks in old_files.values() for vid in chunks.values()}
+    files: Dict[str, Dict[str, str]] = {}
+    stats = {"files": 0, "chunks": 0, "embedded": 0}
+    errors: list = []
+    q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    batch = embedder.batch_size * embedder.max_concurrency  # 한 번에 넘겨야 동시 요청이 다 쓰임
+    consumer = threading.Thread(target=_embed_worker, args=(q, embedder, persist_dir, batch, stats, errors, keep))
+    consumer.start()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for path in iter_source_files(data_dir):
+                pending.append(pool.submit(split_file, path))
+                if len(pending) >= 2 * workers:  # 진행 중인 파일 수 제한 (결과는 파일 순서대로)
+                    _consume(pending.popleft().result(), files, known, stats, q, errors, bm25, dedup)
+            while pending:
+                _consume(pending.popleft().result(), files, known, stats, q, errors, bm25, dedup)
+    finally:
+        q.put(_DONE)
+        consumer.join()
+    if errors:
+        raise errors[0]
+
+    new_ids = {vid for chunks in files.values() for vid in chunks.values()}
+    removed = [vid for vid in known if vid not in new_ids]
+    return files, removed, stats
+
+
+def _consume(result, files, known, stats, q, errors, bm25, dedup):
+    path, items = result
+    stats["files"] += 1
+    for text, meta in items:
+        if dedup is not None and dedup.add(text, meta) is not None:
+            continue
+        files.setdefault(meta["source"], {})[meta["chunk_hash"]] = meta["id"]
+        stats["chunks"] += 1
+        if bm25 is not None:
+            bm25.add(text, meta)
+        if meta["id"] not in known:
+            _put(q, (text, meta), errors)
+
+
+def peak_rss_mb() -> float:
+    """프로세스 최대 RSS (MB, Linux 기준 ru_maxrss=KB). Windows에서는 0"""
+    if resource is None:
+        return 0.0
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
 
 
 # -----------------------------
@@ -105,7 +370,18 @@ def build_faiss(texts: List[str], metas: List[dict], faiss_dir: str):
 def main():
     parser = argparse.ArgumentParser(description="RAG 인덱스 생성 스크립트")
     parser.add_argument("--rebuild", action="store_true", help="기존 인덱스 삭제 후 재생성")
-    parser.add_argument("--faiss", action="store_true", help="FAISS 백업 인덱스도 생성")
+    parser.add_argument("--faiss", action="store_true", help="FAISS 인덱스도 생성")
+    parser.add_argument("--faiss-index-type", choices=FAISS_INDEX_TYPES, default="flat",
+                        help="FAISS 인덱스 종류 (flat=정확, ivf/hnsw=대규모 코퍼스용 근사 검색)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="임베딩 요청 1회당 청크 수")
+    parser.add_argument("--concurrency", type=int, default=EMBED_MAX_CONCURRENCY, help="동시 임베딩 요청 수")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="거의 같은 청크 제거 기준 (MinHash 추정 Jaccard 유사도, 0이면 끔)")
+    parser.add_argument("--stream", action="store_true",
+                        help="대용량 코퍼스용 스트리밍 ingest (프로세스 풀 파싱 + 제한 큐 + 배치 임베딩, 일정한 메모리)")
+    parser.add_argument("--workers", type=int, default=STREAM_WORKERS, help="--stream: 파싱/분할 프로세스 수")
+    parser.add_argument("--queue-size", type=int, default=STREAM_QUEUE_SIZE, help="--stream: 임베딩 대기 청크 상한")
+    parser.add_argument("--embed-cache", default=EMBED_CACHE_PATH, help="임베딩 디스크 캐시 경로 (빈 문자열이면 사용 안 함)")
     args = parser.parse_args()
 
     chroma_dir = VDB_DIR  # vectordb/ (utils.py에서 불러옴)
@@ -119,23 +395,101 @@ def main():
             shutil.rmtree(faiss_dir)
         print(" 기존 인덱스 디렉토리 삭제 완료.")
 
-    # 문서 로딩 → 청크 생성
-    print(" 문서 로딩 및 청크 분할 중…")
-    texts, metas = build_payload()
-    print(f" 청크 {len(texts)}개 준비 완료.💖")
+    manifest = load_manifest(chroma_dir)
+    embedder = get_embedder(args.batch_size, args.concurrency, args.embed_cache)
+    dedup = NearDuplicateIndex(args.dedup_threshold, count_tokens=count_tokens) if args.dedup_threshold > 0 else None
+    # (manifest에 FAISS 동기화 기록이 없거나, ivf/hnsw처럼 증분 갱신이 안 되는 종류면
+    #  Chroma에 있는 벡터로 전체를 다시 만든다 — 임베딩 호출은 없음)
+    faiss_synced = (args.faiss and manifest.get("faiss", False) and os.path.isdir(faiss_dir)
+                    and args.faiss_index_type == "flat" and manifest.get("faiss_index_type", "flat") == "flat")
+
+    if args.stream:
+        # 파일 단위로 파싱·분할 → 새/변경 청크만 곧바로 임베딩·기록 (전체 코퍼스를 메모리에 올리지 않음)
+        print(f" 스트리밍 ingest 중… (파싱 프로세스 {args.workers}개 · 큐 {args.queue_size}청크)💖")
+        # BM25도 청크를 받는 대로 디스크(bm25.sqlite)에 기록 → 본문/역색인이 메모리에 쌓이지 않음
+        bm25, keep = BM25Writer(chroma_dir), ([] if faiss_synced else None)
+        files, removed, counts = stream_ingest(DATA_DIR, chroma_dir, manifest["files"], embedder,
+                                               args.workers, args.queue_size, bm25, keep, dedup)
+        if not counts["chunks"]:
+            raise SystemExit("data/ 폴더에 TXT/PDF 문서를 넣어주세요.")
+        build_chroma([], [], [], removed, chroma_dir)
+        new_texts, new_metas, vectors = [], [], []
+        for batch_texts, batch_metas, batch_vectors in keep or []:
+            new_texts += batch_texts
+            new_metas += batch_metas
+            vectors += batch_vectors
+        stats = dict(embedder.stats)
+        print(f" 파일 {counts['files']}개 · 청크 {counts['chunks']}개 처리 완료.💖")
+        print(f" 변경 사항: 추가/변경 {counts['embedded']}개 · 삭제 {len(removed)}개"
+              f" · 유지 {counts['chunks'] - counts['embedded']}개💖")
+    else:
+        # 문서 로딩 → 청크 생성
+        print(" 문서 로딩 및 청크 분할 중…")
+        texts, metas = build_payload(dedup=dedup)
+        print(f" 청크 {len(texts)}개 준비 완료.💖")
+
+        # manifest와 비교 → 새/변경 청크만 임베딩
+        files = chunk_map(metas)
+        added, removed = diff_manifest(manifest["files"], files)
+        todo = set(added)
+        new_idx = [i for i, m in enumerate(metas) if m["id"] in todo]
+        new_texts = [texts[i] for i in new_idx]
+        new_metas = [metas[i] for i in new_idx]
+        print(f" 변경 사항: 추가/변경 {len(new_texts)}개 · 삭제 {len(removed)}개 · 유지 {len(texts) - len(new_texts)}개💖")
+
+        # 임베딩은 한 번만 → 같은 벡터를 모든 백엔드에 기록
+        print(" 임베딩 계산 중…💖")
+        vectors, stats = embed_texts(new_texts, embedder)
 
-    # Chroma 인덱싱
-    print(" Chroma 인덱싱 중…💖")
-    build_chroma(texts, metas, chroma_dir)
+        # Chroma 인덱싱
+        print(" Chroma 인덱싱 중…💖")
+        build_chroma(new_texts, new_metas, vectors, removed, chroma_dir)
+        bm25 = BM25Index(texts, metas)
+
+    print(f" 임베딩 호출 {stats['calls']}회 · 토큰 {stats['tokens']}개 사용"
+          f" (캐시 적중 {stats['cache_hits']} · 미스 {stats['cache_misses']} · 429 재시도 {stats['retries']})💖")
+
+    # 거의 같은 청크: 대표 청크 메타데이터에 alias 출처 기록
+    aliases = dedup.aliases if dedup else {}
+    present = {vid for chunks in files.values() for vid in chunks.values()}
+    updated = update_aliases(chroma_dir, manifest.get("aliases", {}), aliases, present)
+    if dedup:
+        d = dedup.stats
+        print(f" 중복 제거: 청크 {d['chunks']}개 중 {d['duplicates']}개를 alias로 기록"
+              f" → 임베딩 토큰 {d['duplicate_tokens']}개 절약 (alias 갱신 {updated}개)💖")
     print(f" Chroma 인덱스 완료 → {chroma_dir}💖")
 
-    # --faiss 옵션: FAISS 백업도 함께
+    # --faiss 옵션: FAISS 인덱스도 함께
     if args.faiss:
-        print(" FAISS 백업 인덱스 생성 중…💖")
-        build_faiss(texts, metas, faiss_dir)
+        print(f" FAISS 인덱스({args.faiss_index_type}) 생성 중…💖")
+        if faiss_synced:
+            build_faiss(new_texts, new_metas, vectors, removed, faiss_dir)
+        else:
+            if os.path.isdir(faiss_dir):
+                shutil.rmtree(faiss_dir)
+            if args.stream:
+                build_faiss_from_chroma(chroma_dir, faiss_dir, args.faiss_index_type)
+            else:
+                known = load_chroma_vectors([m["id"] for m in metas], chroma_dir)
+                build_faiss(texts, metas, [known[m["id"]] for m in metas], [], faiss_dir, args.faiss_index_type)
         print(f" FAISS 인덱스 저장 → {faiss_dir}💖")
 
+    # BM25 색인: 임베딩 없이 만들 수 있으므로 매번 전체 청크로 다시 생성
+    print(" BM25 색인 저장 중…💖")
+    if args.stream:
+        bm25.close()
+    else:
+        bm25.save(chroma_dir)
+    print(f" BM25 색인 저장 → {os.path.join(chroma_dir, BM25_DB_NAME if args.stream else BM25_INDEX_NAME)}💖")
+
+    manifest["files"] = files
+    manifest["faiss"] = args.faiss
+    manifest["faiss_index_type"] = args.faiss_index_type
+    manifest["aliases"] = aliases
+    save_manifest(chroma_dir, manifest)
+    print(f" manifest 저장 → {os.path.join(chroma_dir, 'manifest.json')}💖")
+    print(f" 최대 메모리(RSS) {peak_rss_mb()}MB💖")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,298 @@
+# jobs.py
+# 목적:
+#   토론을 HTTP 연결과 분리해 백그라운드 작업으로 실행한다.
+#   - 제출하면 job id를 바로 돌려주고, 상태/진행/결과는 id로 조회
+#   - 워커 수(JOB_WORKERS)만큼만 동시에 실행 → 몰려도 프록시 타임아웃 없이 큐에서 대기
+#   - 같은 (주제, 설정)의 작업이 대기/실행 중이면 새로 만들지 않고 그 작업에 합침(single-flight)
+#   - 저장소: 프로세스 메모리(기본) 또는 SQLite(JOB_STORE=sqlite, 재시작 후 대기 작업 재개)
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# -----------------------------
+# 전역 설정값
+# -----------------------------
+JOB_STORE = os.getenv("JOB_STORE", "memory")             # memory | sqlite
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", ".cache/jobs.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))          # 동시에 실행할 토론 작업 수
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "1000"))  # 보관할 끝난 작업 수
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+logger = logging.getLogger(__name__)
+
+# (topic, rounds, 체크포인트 thread id) → 진행 이벤트(astream_debate 형식)를 내보내는 async iterator
+Runner = Callable[[str, Optional[int], str], AsyncIterator[Dict[str, Any]]]
+
+
+def job_key(topic: str, rounds: Optional[int], thread_id: Optional[str] = None) -> str:
+    """같은 작업인지 판단하는 키 (주제 앞뒤 공백 무시 + 설정 + 이어서 실행할 thread id)"""
+    raw = json.dumps({"topic": topic.strip(), "rounds": rounds, "thread_id": thread_id},
+                     ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def new_job(topic: str, rounds: Optional[int], thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """thread_id가 없으면 job id를 체크포인트 thread id로 씀"""
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    return {
+        "id": job_id,
+        "key": job_key(topic, rounds, thread_id),
+        "topic": topic,
+        "rounds": rounds,
+        "thread_id": thread_id or job_id,
+        "status": QUEUED,
+        "progress": {"node": None, "round": None, "completed": []},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+# -----------------------------
+# 저장소
+# -----------------------------
+class MemoryJobStore:
+    """프로세스 메모리 저장소. 끝난 작업은 JOB_HISTORY_SIZE개까지만 보관"""
+
+    def __init__(self, history: int = JOB_HISTORY_SIZE):
+        self.history = history
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self._evict()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return []  # 메모리 저장소는 재시작하면 비어 있음
+
+    def _evict(self):
+        finished = [k for k, j in self._jobs.items() if j["status"] not in ACTIVE]
+        for k in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[k]
+
+
+class SQLiteJobStore:
+    """SQLite 저장소. 재시작 시 대기/실행 중이던 작업을 다시 큐에 넣을 수 있음"""
+
+    COLUMNS = ("id", "key", "topic", "rounds", "thread_id", "status", "progress", "result", "error",
+               "created_at", "updated_at")
+    JSON_COLUMNS = ("progress", "result")
+
+    def __init__(self, path: str = JOB_STORE_PATH, history: int = JOB_HISTORY_SIZE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.history = history
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " key TEXT NOT NULL,"
+                " topic TEXT NOT NULL,"
+                " rounds INTEGER,"
+                " thread_id TEXT,"
+                " status TEXT NOT NULL,"
+                " progress TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            columns = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "thread_id" not in columns:  # thread_id 이전에 만든 DB
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN thread_id TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.commit()
+
+    def _row(self, row) -> Dict[str, Any]:
+        job = dict(zip(self.COLUMNS, row))
+        for col in self.JSON_COLUMNS:
+            job[col] = json.loads(job[col]) if job[col] else None
+        return job
+
+    def _encode(self, col: str, value: Any) -> Any:
+        return json.dumps(value, ensure_ascii=False) if col in self.JSON_COLUMNS and value is not None else value
+
+    def put(self, job: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                [self._encode(c, job[c]) for c in self.COLUMNS],
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE id IN ("
+                " SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (DONE, FAILED, self.history),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        cols = [c for c in fields if c in self.COLUMNS]
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in cols)} WHERE id = ?",
+                [self._encode(c, fields[c]) for c in cols] + [job_id],
+            )
+            self._conn.commit()
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """대기/실행 중이던 작업 (오래된 순)"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE,
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+
+def make_store(backend: str = JOB_STORE):
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"알 수 없는 JOB_STORE: {backend} (memory | sqlite)")
+
+
+# -----------------------------
+# 작업 큐
+# -----------------------------
+class JobQueue:
+    """
+    asyncio 큐 + 고정 개수 워커.
+    모든 메서드는 이벤트 루프 스레드에서 호출 (FastAPI 핸들러는 async def — 스레드풀에서 부르면 루프 상태와 경합)
+    """
+
+    def __init__(self, runner: Runner, store=None, workers: int = JOB_WORKERS):
+        self.runner = runner
+        self.store = store or make_store()
+        self.workers = workers
+        self.deduplicated = 0
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._waiting: "OrderedDict[str, None]" = OrderedDict()  # 큐에서 대기 중인 job id (순번 계산용)
+        self._inflight: Dict[str, str] = {}  # job_key → 대기/실행 중인 job id
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        for job in self.store.pending():  # (SQLite) 재시작 전 끝나지 못한 작업 재개
+            self.store.update(job["id"], status=QUEUED)
+            self._inflight[job["key"]] = job["id"]
+            self._enqueue(job["id"])
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, topic: str, rounds: Optional[int] = None,
+               thread_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """작업 제출 → (작업, 기존 작업에 합쳐졌는지). thread_id를 주면 그 체크포인트에서 이어서 실행"""
+        key = job_key(topic, rounds, thread_id)
+        job_id = self._inflight.get(key)
+        if job_id:
+            job = self.store.get(job_id)
+            if job and job["status"] in ACTIVE:
+                self.deduplicated += 1
+                return job, True
+
+        job = new_job(topic, rounds, thread_id)
+        self.store.put(job)
+        self._inflight[key] = job["id"]
+        self._enqueue(job["id"])
+        return job, False
+
+    def _enqueue(self, job_id: str):
+        self._waiting[job_id] = None
+        self._queue.put_nowait(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job and job["status"] == QUEUED:
+            job["queue_position"] = self._position(job_id)
+        return job
+
+    def _position(self, job_id: str) -> Optional[int]:
+        try:
+            return list(self._waiting).index(job_id)
+        except ValueError:
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": len(self._waiting), "inflight": len(self._inflight), "deduplicated": self.deduplicated}
+
+    async def _worker(self, n: int):
+        while True:
+            job_id = await self._queue.get()
+            self._waiting.pop(job_id, None)
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        self.store.update(job_id, status=RUNNING)
+        progress = {"node": None, "round": None, "completed": []}
+        finished = False
+        try:
+            async for event in self.runner(job["topic"], job["rounds"], job.get("thread_id") or job_id):
+                kind = event["event"]
+                if kind == "node_start":
+                    progress.update(node=event["node"], round=event.get("round"))
+                    self.store.update(job_id, progress=progress)
+                elif kind == "node_end":
+                    progress["completed"].append(event["node"])
+                    self.store.update(job_id, progress=progress)
+                elif kind == "done":
+                    result = {k: v for k, v in event.items() if k != "event"}
+                    self.store.update(job_id, status=DONE, result=result, progress=progress)
+                    finished = True
+                elif kind == "error":
+                    raise RuntimeError(event.get("message"))
+            if not finished:
+                raise RuntimeError("토론이 결과 없이 끝났습니다")
+        except asyncio.CancelledError:
+            raise  # 종료 중: SQLite 저장소면 running 상태로 남아 재시작 때 재개
+        except Exception as e:
+            logger.exception("job %s 실패", job_id)
+            self.store.update(job_id, status=FAILED, error=str(e), progress=progress)
+        finally:
+            if self._inflight.get(job["key"]) == job_id:
+                del self._inflight[job["key"]]
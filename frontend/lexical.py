@@ -0,0 +1,268 @@
+# lexical.py
+# 목적:
+#   임베딩 호출 없이 프로세스 안에서 도는 BM25 역색인.
+#   - ingest.py가 청크 전체로 만들어 vectordb/bm25.json 에 저장
+#   - 토론 검색 시 벡터 검색 결과와 RRF(reciprocal rank fusion)로 합치거나, 단독(lexical 모드)으로 사용
+#   - 조문·판례 번호("제250조", "2019헌바59")처럼 임베딩이 뭉개는 정확한 표현에 강함
+#   - ingest.py --stream 은 BM25Writer로 vectordb/bm25.sqlite 에 청크를 하나씩 기록 (본문·역색인을 메모리에 모으지 않음)
+#     → 검색 때는 SQLiteBM25Index가 질의 term의 posting만 디스크에서 읽음
+
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+BM25_INDEX_NAME = "bm25.json"
+BM25_DB_NAME = "bm25.sqlite"  # 스트리밍 ingest용 디스크 색인
+BM25_WRITE_BATCH = 10000      # BM25Writer: 한 번에 기록할 posting 행 수
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # RRF 순위 상수 (클수록 하위 순위 반영이 완만)
+
+# 조문/판례 번호는 하나의 토큰으로 보존 (예: 제250조의2, 2019헌바59, 2018다12345)
+_CITATION = re.compile(r"제\d+조(?:의\d+)?(?:제\d+항)?|\d{2,4}[가-힣]{1,2}\d+")
+_WORD = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL = re.compile(r"[가-힣]")
+
+
+# -----------------------------
+# 토크나이저
+# -----------------------------
+def tokenize(text: str) -> List[str]:
+    """
+    한국어용 경량 토크나이저 (형태소 분석기 의존성 없음)
+    - 조문/판례 번호 → 통째로 1토큰
+    - 한글 어절 → 어절 전체 + 글자 bigram (조사·어미가 붙어도 어간 bigram이 겹침)
+    - 영문/숫자 → 소문자 단어
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    tokens = _CITATION.findall(text)
+    for word in _WORD.findall(_CITATION.sub(" ", text)):
+        tokens.append(word)
+        if len(word) > 1 and _HANGUL.match(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+# -----------------------------
+# BM25 점수
+# -----------------------------
+def bm25_idf(n: int, df: int) -> float:
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+def bm25_term(idf: float, qtf: int, tf: int, doc_len: int, avgdl: float, k1: float, b: float) -> float:
+    norm = tf + k1 * (1 - b + b * doc_len / (avgdl or 1))
+    return qtf * idf * tf * (k1 + 1) / norm
+
+
+# -----------------------------
+# BM25 색인
+# -----------------------------
+class BM25Index:
+    """청크 텍스트/메타데이터와 역색인(term → [[청크 번호, tf], ...])을 함께 보관"""
+
+    def __init__(self, texts: Sequence[str] = (), metas: Sequence[Dict[str, Any]] = (),
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.texts: List[str] = []
+        self.metas: List[Dict[str, Any]] = []
+        self.doc_len: List[int] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        for i, text in enumerate(texts):
+            self.add(text, metas[i] if metas else {})
+        self._prepare()
+
+    def add(self, text: str, meta: Dict[str, Any]):
+        """청크 1개 추가 (스트리밍 ingest용 — 다 넣은 뒤 save 전에 통계가 다시 계산됨)"""
+        i = len(self.texts)
+        self.texts.append(text)
+        self.metas.append(meta)
+        counts = Counter(tokenize(text))
+        self.doc_len.append(sum(counts.values()))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, []).append([i, tf])
+
+    def _prepare(self):
+        n = len(self.texts)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {term: bm25_idf(n, len(p)) for term, p in self.postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def doc(self, i: int) -> Tuple[str, Dict[str, Any]]:
+        """청크 번호 → (본문, 메타데이터)"""
+        return self.texts[i], self.metas[i]
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """질의 → 상위 k개 (청크 번호, BM25 점수)"""
+        scores: Dict[int, float] = {}
+        for term, qtf in Counter(tokenize(query)).items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                scores[i] = scores.get(i, 0.0) + bm25_term(idf, qtf, tf, self.doc_len[i], self.avgdl, self.k1, self.b)
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+
+    # -----------------------------
+    # 저장 / 로드
+    # -----------------------------
+    def save(self, index_dir: str):
+        """index_dir/bm25.json 에 원자적으로 기록 (이전 실행의 bm25.sqlite는 삭제 → 색인 파일은 항상 하나)"""
+        self._prepare()
+        os.makedirs(index_dir, exist_ok=True)
+        path = os.path.join(index_dir, BM25_INDEX_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "texts": self.texts,
+                "metas": self.metas,
+                "doc_len": self.doc_len,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        _remove(os.path.join(index_dir, BM25_DB_NAME))
+
+    @classmethod
+    def load(cls, index_dir: str) -> "BM25Index":
+        with open(os.path.join(index_dir, BM25_INDEX_NAME), encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.texts = data["texts"]
+        index.metas = data["metas"]
+        index.doc_len = data["doc_len"]
+        index.postings = data["postings"]
+        index._prepare()
+        return index
+
+
+# -----------------------------
+# 디스크 색인 (스트리밍 ingest)
+# -----------------------------
+_SCHEMA = (
+    "CREATE TABLE docs (i INTEGER PRIMARY KEY, text TEXT NOT NULL, meta TEXT NOT NULL, len INTEGER NOT NULL)",
+    "CREATE TABLE postings (term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL)",
+    "CREATE TABLE params (key TEXT PRIMARY KEY, value REAL NOT NULL)",
+)
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class BM25Writer:
+    """
+    청크를 하나씩 add() → index_dir/bm25.sqlite.tmp 에 바로 기록, close()에서 df/평균 길이 계산 후 교체.
+    메모리에는 아직 기록하지 않은 posting 최대 BM25_WRITE_BATCH행만 남는다.
+    """
+
+    def __init__(self, index_dir: str, k1: float = BM25_K1, b: float = BM25_B):
+        os.makedirs(index_dir, exist_ok=True)
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, BM25_DB_NAME)
+        self.tmp = self.path + ".tmp"
+        _remove(self.tmp)
+        self.k1, self.b = k1, b
+        self.n = 0
+        self.total_len = 0
+        self._docs: List[tuple] = []
+        self._postings: List[tuple] = []
+        self._conn = sqlite3.connect(self.tmp)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        for ddl in _SCHEMA:
+            self._conn.execute(ddl)
+
+    def add(self, text: str, meta: Dict[str, Any]):
+        counts = Counter(tokenize(text))
+        doc_len = sum(counts.values())
+        self._docs.append((self.n, text, json.dumps(meta, ensure_ascii=False), doc_len))
+        self._postings.extend((term, self.n, tf) for term, tf in counts.items())
+        self.n += 1
+        self.total_len += doc_len
+        if len(self._postings) >= BM25_WRITE_BATCH:
+            self._flush()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _flush(self):
+        self._conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", self._docs)
+        self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", self._postings)
+        self._conn.commit()
+        self._docs, self._postings = [], []
+
+    def close(self):
+        """term 색인·df 표 생성 → bm25.sqlite 로 원자적 교체 (이전 실행의 bm25.json은 삭제)"""
+        self._flush()
+        self._conn.execute("CREATE INDEX postings_term ON postings (term)")
+        self._conn.execute("CREATE TABLE terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        self._conn.execute("INSERT INTO terms SELECT term, COUNT(*) FROM postings GROUP BY term")
+        self._conn.executemany("INSERT INTO params VALUES (?, ?)", [
+            ("k1", self.k1), ("b", self.b), ("n", self.n),
+            ("avgdl", (self.total_len / self.n) if self.n else 0.0),
+        ])
+        self._conn.commit()
+        self._conn.close()
+        os.replace(self.tmp, self.path)
+        _remove(os.path.join(self.index_dir, BM25_INDEX_NAME))
+
+
+class SQLiteBM25Index:
+    """bm25.sqlite 읽기 전용 검색 (BM25Index와 같은 search/doc 인터페이스, 본문은 필요한 청크만 읽음)"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        params = dict(self._conn.execute("SELECT key, value FROM params"))
+        self.k1, self.b, self.avgdl = params["k1"], params["b"], params["avgdl"]
+        self.n = int(params["n"])
+
+    @classmethod
+    def load(cls, index_dir: str) -> "SQLiteBM25Index":
+        return cls(os.path.join(index_dir, BM25_DB_NAME))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def doc(self, i: int) -> Tuple[str, Dict[str, Any]]:
+        with self._lock:
+            text, meta = self._conn.execute("SELECT text, meta FROM docs WHERE i = ?", (i,)).fetchone()
+        return text, json.loads(meta)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for term, qtf in Counter(tokenize(query)).items():
+                row = self._conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                idf = bm25_idf(self.n, row[0])
+                for i, tf, doc_len in self._conn.execute(
+                        "SELECT p.doc, p.tf, d.len FROM postings p JOIN docs d ON d.i = p.doc WHERE p.term = ?", (term,)):
+                    scores[i] = scores.get(i, 0.0) + bm25_term(idf, qtf, tf, doc_len, self.avgdl, self.k1, self.b)
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+
+
+# -----------------------------
+# 결과 합치기
+# -----------------------------
+def rrf_fuse(rankings: Iterable[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """여러 순위 목록(문서 키 순서) → RRF 점수 내림차순 [(키, 점수)]"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda x: -x[1])
@@ -0,0 +1,184 @@
+# llm_cache.py
+# 목적:
+#   토론 노드의 LLM 응답을 (배포명, temperature, 완성된 프롬프트 해시) 키로 캐시.
+#   같은 주제 + 같은 참고 문서면 planner/검사/변호사/판사/보고서를 다시 생성하지 않는다.
+#   기본은 꺼져 있음(opt-in): LLM_CACHE_BACKEND=memory | sqlite
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+
+# -----------------------------
+# 전역 설정값
+# -----------------------------
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "off")    # off | memory | sqlite
+LLM_CACHE_NODES = os.getenv("LLM_CACHE_NODES", "planner,prosecution,defense,summarize,judge,writer")  # 캐시를 쓸 노드
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))     # 초
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))    # 최대 항목 수
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+
+
+def cache_key(deployment: str, temperature: float, prompt: str) -> str:
+    """(배포명, temperature, 프롬프트) → sha256 키"""
+    raw = f"{deployment}\n{temperature}\n{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# 백엔드
+# -----------------------------
+class MemoryLRUCache:
+    """프로세스 메모리 LRU (TTL 지난 항목은 조회 시 제거)"""
+
+    blocking = False  # 이벤트 루프에서 바로 호출해도 됨
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, created = item
+            if time.time() - created > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    디스크(SQLite) 캐시. TTL 만료 + 최대 항목 수 초과 시 오래 안 쓴 것부터 제거.
+    조회는 읽기만 하고 last_used 갱신은 메모리에 모아 두었다가 다음 set()에서 함께 기록.
+    """
+
+    blocking = True  # 디스크 I/O → 비동기 코드에서는 스레드에서 호출 (ResponseCache.alookup/astore)
+
+    def __init__(self, path: str = LLM_CACHE_PATH, maxsize: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # 아직 기록하지 않은 last_used
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at >= ?", (key, now - self.ttl)).fetchone()
+            if row is None:
+                return None  # 만료된 행은 다음 set()에서 지움
+            self._touched[key] = now
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self._touched:
+                self._conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                       [(t, k) for k, t in self._touched.items()])
+                self._touched.clear()
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            self._conn.commit()
+
+
+# -----------------------------
+# 노드별 캐시
+# -----------------------------
+class ResponseCache:
+    """노드별 on/off 플래그와 적중/미스 카운터를 가진 응답 캐시"""
+
+    def __init__(self, backend, nodes):
+        self.backend = backend
+        self.nodes = set(nodes)
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, node: str) -> bool:
+        return node in self.nodes
+
+    def lookup(self, node: str, deployment: str, temperature: float, prompt: str) -> Optional[str]:
+        if not self.enabled(node):
+            return None
+        value = self.backend.get(cache_key(deployment, temperature, prompt))
+        counter = self.misses if value is None else self.hits
+        with self._lock:
+            counter[node] = counter.get(node, 0) + 1
+        return value
+
+    def store(self, node: str, deployment: str, temperature: float, prompt: str, value: str):
+        if self.enabled(node):
+            self.backend.set(cache_key(deployment, temperature, prompt), value)
+
+    async def alookup(self, node: str, deployment: str, temperature: float, prompt: str) -> Optional[str]:
+        """lookup의 비동기 버전 (디스크 백엔드는 스레드에서 실행해 이벤트 루프를 막지 않음)"""
+        if not self.enabled(node):
+            return None
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.lookup, node, deployment, temperature, prompt)
+        return self.lookup(node, deployment, temperature, prompt)
+
+    async def astore(self, node: str, deployment: str, temperature: float, prompt: str, value: str):
+        if not self.enabled(node):
+            return
+        if self.backend.blocking:
+            await asyncio.to_thread(self.store, node, deployment, temperature, prompt, value)
+        else:
+            self.store(node, deployment, temperature, prompt, value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> Optional[ResponseCache]:
+    """환경변수 설정대로 만든 응답 캐시 (꺼져 있으면 None)"""
+    nodes = [n.strip() for n in LLM_CACHE_NODES.split(",") if n.strip()]
+    if LLM_CACHE_BACKEND == "memory":
+        return ResponseCache(MemoryLRUCache(), nodes)
+    if LLM_CACHE_BACKEND == "sqlite":
+        return ResponseCache(SQLiteCache(), nodes)
+    if LLM_CACHE_BACKEND == "off":
+        return None
+    raise ValueError(f"알 수 없는 LLM_CACHE_BACKEND: {LLM_CACHE_BACKEND} (off | memory | sqlite)")
@@ -0,0 +1,65 @@
+# manifest.py
+# 목적:
+#   인덱스 옆(vectordb/manifest.json)에 "소스 파일 + 청크 내용 해시 → 벡터 ID" 를 기록해
+#   다음 ingest 때 새로 생겼거나 바뀐 청크만 임베딩하고, 사라진 청크의 벡터는 지운다.
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# {source: {chunk_hash: vector_id}}
+ChunkMap = Dict[str, Dict[str, str]]
+
+
+def chunk_hash(text: str) -> str:
+    """청크 내용 해시 (sha256)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def vector_id(source: str, c_hash: str) -> str:
+    """소스 파일 + 청크 해시로 만든 결정적 벡터 ID"""
+    return hashlib.sha256(f"{source}\n{c_hash}".encode("utf-8")).hexdigest()[:32]
+
+
+def load_manifest(index_dir: str) -> dict:
+    """manifest.json 읽기 (없거나 버전이 다르면 빈 manifest)"""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def save_manifest(index_dir: str, manifest: dict):
+    """manifest.json 저장 (임시 파일에 쓴 뒤 교체해서 중간에 깨지지 않게)"""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    manifest["version"] = MANIFEST_VERSION
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def manifest_ids(files: ChunkMap) -> List[str]:
+    """manifest에 기록된 모든 벡터 ID"""
+    return [vid for chunks in files.values() for vid in chunks.values()]
+
+
+def diff_manifest(old: ChunkMap, new: ChunkMap) -> Tuple[List[str], List[str]]:
+    """
+    이전/현재 청크 맵 비교.
+    반환: (새로 임베딩해야 할 벡터 ID, 삭제해야 할 벡터 ID)
+    """
+    old_ids = set(manifest_ids(old))
+    new_ids = set(manifest_ids(new))
+    added = [vid for vid in manifest_ids(new) if vid not in old_ids]
+    removed = [vid for vid in manifest_ids(old) if vid not in new_ids]
+    return added, removed
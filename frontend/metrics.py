@@ -0,0 +1,180 @@
+# metrics.py
+# 목적:
+#   외부 의존성(LangSmith, prometheus_client) 없이 토론 서비스의 운영 지표를 모아
+#   Prometheus 텍스트 형식(/metrics)으로 내보낸다. (선택) 요청별 구조화 trace 로그.
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+TRACE_LOG = os.getenv("DEBATE_TRACE_LOG", "0") == "1"  # 요청별 trace 로그 (JSON 한 줄)
+trace_logger = logging.getLogger("debate.trace")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)  # 초
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# -----------------------------
+# 지표 타입
+# -----------------------------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """조회 시점에 fn()으로 값을 읽는 gauge (예: 캐시 적중 수)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return self.header() + [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple, list] = {}  # key → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, count in zip(self.buckets, row):
+                    le = _labels(self.labelnames, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                le = _labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {row[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {row[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# 토론 서비스 지표
+# -----------------------------
+REGISTRY = Registry()
+
+NODE_LATENCY = REGISTRY.register(Histogram(
+    "debate_node_latency_seconds", "토론 그래프 노드별 실행 시간", ["node"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "debate_llm_tokens_total", "노드별 LLM 토큰 수 (kind=prompt|completion)", ["node", "kind"]))
+LLM_CALLS = REGISTRY.register(Counter(
+    "debate_llm_calls_total", "노드별 LLM 호출 수 (cached=1이면 응답 캐시 적중)", ["node", "cached"]))
+RETRIEVAL_LATENCY = REGISTRY.register(Histogram(
+    "debate_retrieval_latency_seconds", "문서 검색 시간 (mode=vector|lexical|hybrid)", ["mode"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)))
+RETRIEVED_DOCS = REGISTRY.register(Counter(
+    "debate_retrieved_docs_total", "검색으로 가져온 문서 수"))
+RETRIEVAL_EMPTY = REGISTRY.register(Counter(
+    "debate_retrieval_empty_total", "검색 결과가 0건인 요청 수"))
+DEBATES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "debates_in_flight", "진행 중인 토론 수"))
+DEBATES_TOTAL = REGISTRY.register(Counter(
+    "debates_total", "완료된 토론 수", ["endpoint", "status"]))
+DEBATE_ERRORS = REGISTRY.register(Counter(
+    "debate_errors_total", "단계별 오류 수", ["stage"]))
+
+
+def register_callback_gauge(name: str, help_text: str, fn: Callable[[], float]):
+    REGISTRY.register(CallbackGauge(name, help_text, fn))
+
+
+def log_trace(request_id: str, endpoint: str, status: str, state: dict = None, latency: dict = None, error: str = None):
+    """요청 1건의 trace를 JSON 한 줄로 기록 (DEBATE_TRACE_LOG=1 일 때만)"""
+    if not TRACE_LOG:
+        return
+    state = state or {}
+    trace_logger.info(json.dumps({
+        "request_id": request_id,
+        "endpoint": endpoint,
+        "status": status,
+        "topic": state.get("topic"),
+        "latency": latency or {},
+        "token_usage": state.get("token_usage", {}),
+        "error": error,
+    }, ensure_ascii=False))
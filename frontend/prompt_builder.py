@@ -0,0 +1,122 @@
+# prompt_builder.py
+# 목적:
+#   prompts.py의 템플릿을 채울 때 노드별 토큰 예산을 넘지 않도록
+#   참고 문서(순위순)와 발언 기록(최신순)을 잘라 넣는다.
+#   → 판사/보고서 프롬프트가 끝없이 커지는 것을 막고, 같은 문서를 세 노드에 통째로 보내지 않음.
+
+import os
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+
+# -----------------------------
+# 전역 설정값
+# -----------------------------
+TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "o200k_base")  # gpt-4o 계열 토크나이저
+
+# 노드별 프롬프트 토큰 예산 (환경변수 PROMPT_BUDGET_<NODE> 로 덮어쓰기)
+NODE_TOKEN_BUDGETS = {
+    node: int(os.getenv(f"PROMPT_BUDGET_{node.upper()}", default))
+    for node, default in {
+        "planner": 800,
+        "prosecution": 1500,
+        "defense": 2500,
+        "judge": 3500,
+        "writer": 3000,
+        "summarize": 1500,
+    }.items()
+}
+DOC_SNIPPET_TOKENS = int(os.getenv("PROMPT_DOC_SNIPPET_TOKENS", "400"))  # 문서 스니펫 1개당 최대 토큰
+MIN_PIECE_TOKENS = 20  # 이보다 적게 남으면 항목을 더 넣지 않음
+
+# 가변 필드 → 우선순위 ("first": 앞쪽(검색 순위)부터, "last": 최신 발언부터)
+FIELD_PRIORITY = {
+    "docs": "first",
+    "pros": "last",
+    "defs": "last",
+    "judge": "first",
+    "pros_summary": "first",
+    "defs_summary": "first",
+    "summary": "first",
+    "args": "last",
+}
+
+
+# -----------------------------
+# 토큰 계산
+# -----------------------------
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None  # 인코더를 못 받으면(오프라인 등) 글자 수로 근사
+
+def token_len(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text)) if enc else len(text)
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """앞에서부터 max_tokens 토큰까지만 남김"""
+    enc = _encoding()
+    if enc is None:
+        return text if len(text) <= max_tokens else text[:max_tokens] + "…"
+    ids = enc.encode(text)
+    if len(ids) <= max_tokens:
+        return text
+    return enc.decode(ids[:max_tokens]) + "…"
+
+
+# -----------------------------
+# 예산 배분
+# -----------------------------
+def _allocate(needs: Dict[str, int], total: int) -> Dict[str, int]:
+    """필요량이 적은 필드부터 채우고 남는 몫은 나머지에 넘기는 max-min 배분"""
+    alloc, left = {}, total
+    pending = sorted(needs, key=needs.get)
+    while pending:
+        share = left // len(pending)
+        key = pending.pop(0)
+        alloc[key] = min(needs[key], share)
+        left -= alloc[key]
+    return alloc
+
+def fit_items(items: List[str], budget: int, priority: str = "first", item_cap: int = None) -> str:
+    """우선순위대로 항목을 넣고, 예산에 걸리는 항목은 잘라서 넣음"""
+    order = list(items) if priority == "first" else list(reversed(items))
+    out, left = [], budget
+    for text in order:
+        if left < MIN_PIECE_TOKENS:
+            break
+        piece = truncate_tokens(text, min(left, item_cap) if item_cap else left)
+        out.append(piece)
+        left -= token_len(piece) + 1
+    if priority == "last":
+        out.reverse()
+    return "\n".join(out)
+
+def build_prompt(node: str, template: str, fixed: Dict[str, str], variable: Dict[str, List[str]]) -> Tuple[str, int]:
+    """
+    template을 채워 노드 예산 안의 프롬프트를 만든다.
+    - fixed    : 그대로 넣는 값 (topic 등)
+    - variable : 잘라도 되는 값 목록 (docs / pros / defs / judge)
+    반환: (프롬프트, 프롬프트 토큰 수)
+    """
+    budget = NODE_TOKEN_BUDGETS.get(node)
+    if budget is None:
+        filled = {k: "\n".join(v) for k, v in variable.items()}
+        prompt = template.format(**fixed, **filled)
+        return prompt, token_len(prompt)
+
+    base = template.format(**fixed, **{k: "" for k in variable})
+    remaining = max(0, budget - token_len(base))
+    needs = {k: token_len("\n".join(v)) for k, v in variable.items()}
+    alloc = _allocate(needs, remaining)
+
+    filled = {
+        k: fit_items(v, alloc[k], FIELD_PRIORITY.get(k, "first"), DOC_SNIPPET_TOKENS if k == "docs" else None)
+        for k, v in variable.items()
+    }
+    prompt = template.format(**fixed, **filled)
+    return prompt, token_len(prompt)
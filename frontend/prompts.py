@@ -38,9 +38,41 @@ defense_prompt = """
 {docs}
 """
 
+prosecution_rebuttal_prompt = """
+당신은 검사입니다. 주제 {topic} 에 대해 찬성(유지)하는 입장에서 {round}라운드 재반박을 하세요.
+- 지난 라운드 요약(검사): {pros_summary}
+- 지난 라운드 요약(변호사): {defs_summary}
+- 직전 변호사 주장: {defs}
+- 변호사의 핵심 주장 1~2개를 명시적으로 요약·반박하고, 이미 한 주장은 반복하지 마세요.
+- 반드시 {topic}과 직접 관련된 논거만 사용하세요.
+- 참고 문서:
+{docs}
+"""
+
+defense_rebuttal_prompt = """
+당신은 변호사입니다. 주제 {topic} 에 대해 반대(폐지)하는 입장에서 {round}라운드 재반박을 하세요.
+- 지난 라운드 요약(검사): {pros_summary}
+- 지난 라운드 요약(변호사): {defs_summary}
+- 직전 검사 주장: {pros}
+- 검사의 핵심 주장 1~2개를 명시적으로 요약·반박하고, 이미 한 주장은 반복하지 마세요.
+- 반드시 {topic}과 직접 관련된 논거만 사용하세요.
+- 참고 문서:
+{docs}
+"""
+
+summary_prompt = """
+주제 {topic} 토론에서 {role}의 발언을 누적 요약하세요.
+- 이전 요약과 이번 라운드 발언을 합쳐, 핵심 논거·인용 근거·상대 주장에 대한 반박만 남기세요.
+- 중복은 합치고 {max_chars}자 이내로 작성하세요.
+- 이전 요약: {summary}
+- 이번 라운드 발언: {args}
+"""
+
 judge_prompt = """
 당신은 판사입니다. 아래 검사의 주장과 변호사의 주장을 요약하고, 균형 잡힌 판단을 내려주세요.
 - 주제: {topic}
+- 지난 라운드 요약(검사): {pros_summary}
+- 지난 라운드 요약(변호사): {defs_summary}
 - 검사: {pros}
 - 변호사: {defs}
 - 참고 문서:
@@ -50,6 +82,8 @@ judge_prompt = """
 writer_prompt = """
 최종 보고서를 작성하세요.
 - 주제: {topic}
+- 지난 라운드 요약(검사): {pros_summary}
+- 지난 라운드 요약(변호사): {defs_summary}
 - 검사: {pros}
 - 변호사: {defs}
 - 판사: {judge}
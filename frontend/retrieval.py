@@ -0,0 +1,138 @@
+# retrieval.py
+# 목적:
+#   토론용 문서 검색. RETRIEVAL_MODE 로 방식 선택
+#   - vector  : 벡터 유사도 검색 (질의 임베딩 1회)
+#   - lexical : BM25만 사용 → 임베딩 호출 없음 (가장 빠름)
+#   - hybrid  : 벡터 + BM25 후보를 동시에 구해 RRF로 합침 (기본, BM25 색인이 없으면 vector로 동작)
+#   벡터 검색 백엔드는 VECTOR_BACKEND 로 선택
+#   - chroma : vectordb/ 의 Chroma 컬렉션 (기본)
+#   - faiss  : ingest.py --faiss 로 만든 vectordb/faiss_backup/faiss_index (memory-mapped 로드)
+
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+from langchain_core.documents import Document
+
+from frontend import utils
+from frontend.lexical import BM25_DB_NAME, BM25_INDEX_NAME, BM25Index, SQLiteBM25Index, rrf_fuse
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")           # vector | lexical | hybrid
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "3"))                 # 토론에 넘길 문서 수
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "10"))    # hybrid: 방식별 후보 수
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")           # chroma | faiss
+VECTOR_BACKENDS = ("chroma", "faiss")
+
+logger = logging.getLogger(__name__)
+
+
+def faiss_path() -> str:
+    return os.path.join(utils.VDB_DIR, "faiss_backup", "faiss_index")
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(backend: str = None):
+    """설정된 벡터 검색 백엔드 (프로세스당 한 번만 연다)"""
+    backend = backend or VECTOR_BACKEND
+    if backend == "chroma":
+        return utils.get_vectorstore()
+    if backend == "faiss":
+        from frontend.faiss_store import load_faiss  # faiss는 이 백엔드를 쓸 때만 import
+        return load_faiss(faiss_path(), utils.get_query_embeddings())
+    raise ValueError(f"알 수 없는 VECTOR_BACKEND: {backend} ({' | '.join(VECTOR_BACKENDS)})")
+
+
+@lru_cache(maxsize=1)
+def get_lexical_index() -> Optional[Union[BM25Index, SQLiteBM25Index]]:
+    """ingest.py가 만든 BM25 색인: bm25.json(메모리) 또는 bm25.sqlite(--stream, 디스크). 없으면 None"""
+    if os.path.exists(os.path.join(utils.VDB_DIR, BM25_INDEX_NAME)):
+        return BM25Index.load(utils.VDB_DIR)
+    if os.path.exists(os.path.join(utils.VDB_DIR, BM25_DB_NAME)):
+        return SQLiteBM25Index.load(utils.VDB_DIR)
+    logger.warning("BM25 색인이 없습니다 (%s) → 벡터 검색만 사용. ingest.py를 다시 실행하세요.", utils.VDB_DIR)
+    return None
+
+
+def _key(doc: Document) -> str:
+    """두 검색 결과에서 같은 청크를 알아보는 키 (ingest의 벡터 id, 없으면 본문)"""
+    return doc.metadata.get("id") or doc.page_content
+
+
+def lexical_search(query: str, k: int) -> List[Document]:
+    index = get_lexical_index()
+    if index is None:
+        return []
+    docs = []
+    for i, _ in index.search(query, k):
+        text, meta = index.doc(i)
+        docs.append(Document(page_content=text, metadata=dict(meta)))
+    return docs
+
+
+async def vector_search(query: str, k: int) -> List[Document]:
+    return await get_vector_store().asimilarity_search(query, k=k)
+
+
+async def vector_search_many(queries: List[str], k: int) -> List[List[Document]]:
+    """질의 여러 개: 임베딩은 한 번의 embed_documents 호출로, 벡터 검색은 동시에"""
+    store = get_vector_store()
+    vectors = await utils.get_query_embeddings().aembed_queries(queries)
+    return list(await asyncio.gather(*(asyncio.to_thread(store.similarity_search_by_vector, vec, k) for vec in vectors)))
+
+
+async def lexical_search_many(queries: List[str], k: int) -> List[List[Document]]:
+    return list(await asyncio.gather(*(asyncio.to_thread(lexical_search, q, k) for q in queries)))
+
+
+def _resolve(mode: Optional[str], k: Optional[int]):
+    mode = mode or RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"알 수 없는 RETRIEVAL_MODE: {mode} ({' | '.join(RETRIEVAL_MODES)})")
+    if mode == "hybrid" and get_lexical_index() is None:
+        mode = "vector"
+    return mode, k or RETRIEVAL_K
+
+
+def fuse(rankings: List[List[Document]], k: int) -> List[Document]:
+    """여러 검색 결과 → RRF로 합친 상위 k개 (같은 청크는 한 번만)"""
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for doc in ranking:
+            docs.setdefault(_key(doc), doc)
+    fused = rrf_fuse([[_key(d) for d in ranking] for ranking in rankings])
+    return [docs[key] for key, _ in fused[:k]]
+
+
+async def retrieve(query: str, mode: str = None, k: int = None) -> List[Document]:
+    """질의 → 상위 k개 문서"""
+    mode, k = _resolve(mode, k)
+    if mode == "lexical":
+        return lexical_search(query, k)
+    if mode == "vector":
+        return await vector_search(query, k)
+
+    fetch_k = max(k, RETRIEVAL_FETCH_K)
+    dense, sparse = await asyncio.gather(
+        vector_search(query, fetch_k),
+        asyncio.to_thread(lexical_search, query, fetch_k),
+    )
+    return fuse([dense, sparse], k)
+
+
+async def retrieve_many(queries: List[str], mode: str = None, k: int = None) -> List[List[Document]]:
+    """질의 목록 → 질의별 상위 k개 문서 (retrieve와 같은 결과, 질의 임베딩은 1회 호출로 묶음)"""
+    mode, k = _resolve(mode, k)
+    if mode == "lexical":
+        return await lexical_search_many(queries, k)
+    if mode == "vector":
+        return await vector_search_many(queries, k)
+
+    fetch_k = max(k, RETRIEVAL_FETCH_K)
+    dense, sparse = await asyncio.gather(
+        vector_search_many(queries, fetch_k),
+        lexical_search_many(queries, fetch_k),
+    )
+    return [fuse([d, s], k) for d, s in zip(dense, sparse)]
@@ -1,55 +1,183 @@
 import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+import tiktoken
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import AzureOpenAIEmbeddings
 from langchain_chroma import Chroma
 
-from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
 
 load_dotenv()
 
 AOAI_ENDPOINT = os.getenv("AOAI_ENDPOINT")
 AOAI_API_KEY = os.getenv("AOAI_API_KEY")
 DEPLOY_EMBED = os.getenv("AOAI_DEPLOY_EMBED_3_SMALL")
+DATA_DIR = os.getenv("DATA_DIR", "data")
 VDB_DIR = "./vectordb"
+COLLECTION_NAME = "langchain"  # langchain_chroma 기본 컬렉션 이름
 
-# 문서 로드 & 임베딩 & Chroma 저장
-def load_and_ingest():
-    loader = TextLoader("data/death_penalty_guide.txt")
-    docs = loader.load()
+# 질의 임베딩 캐시 (LRU + TTL)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "3600"))  # 초
+
+
+# -----------------------------
+# 질의 임베딩 캐시
+# -----------------------------
+def normalize_query(text: str) -> str:
+    """캐시 키용 질의 정규화 (유니코드 NFC + 공백 정리)"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    embed_query 결과를 (모델, 정규화된 질의) 키로 캐시하는 임베딩 래퍼.
+    같은 주제가 반복되면 원격 임베딩 호출 없이 캐시된 벡터를 돌려줌.
+    문서 임베딩(embed_documents)은 그대로 통과.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, maxsize: int = QUERY_CACHE_SIZE, ttl: int = QUERY_CACHE_TTL):
+        self.embeddings = embeddings
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            vec = self._cache.get(key)
+            if vec is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vec
+
+    def _store(self, key, vec: List[float]):
+        with self._lock:
+            self._cache[key] = vec
+
+    def embed_query(self, text: str) -> List[float]:
+        query = normalize_query(text)
+        key = (self.model, query)
+        vec = self._lookup(key)
+        if vec is None:
+            vec = self.embeddings.embed_query(query)
+            self._store(key, vec)
+        return vec
+
+    async def aembed_query(self, text: str) -> List[float]:
+        query = normalize_query(text)
+        key = (self.model, query)
+        vec = self._lookup(key)
+        if vec is None:
+            vec = await self.embeddings.aembed_query(query)
+            self._store(key, vec)
+        return vec
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """여러 질의를 한 번에: 캐시에 없는 질의만 모아 embed_documents 1회로 임베딩"""
+        keys = [(self.model, normalize_query(t)) for t in texts]
+        vectors = {key: self._lookup(key) for key in dict.fromkeys(keys)}
+        missing = [key for key, vec in vectors.items() if vec is None]
+        if missing:
+            embedded = await self.embeddings.aembed_documents([query for _, query in missing])
+            for key, vec in zip(missing, embedded):
+                self._store(key, vec)
+                vectors[key] = vec
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, float]:
+        """캐시 적중/미스 카운터"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-    )
-    splits = splitter.split_documents(docs)
 
-    embeddings = AzureOpenAIEmbeddings(
+# -----------------------------
+# 프로세스 전역 클라이언트 (한 번만 생성)
+# -----------------------------
+@lru_cache(maxsize=1)
+def get_embeddings() -> AzureOpenAIEmbeddings:
+    """Azure OpenAI 임베딩 클라이언트 (프로세스당 1개)"""
+    return AzureOpenAIEmbeddings(
         model=os.getenv("AOAI_DEPLOY_EMBED_3_SMALL"),
         azure_endpoint=os.getenv("AOAI_ENDPOINT"),
         api_key=os.getenv("AOAI_API_KEY"),
         api_version=os.getenv("OPENAI_API_VERSION", "2024-05-01-preview"),
     )
 
-    db = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
+@lru_cache(maxsize=1)
+def get_query_embeddings() -> QueryEmbeddingCache:
+    """질의 임베딩 캐시가 붙은 임베딩 (retriever 용)"""
+    return QueryEmbeddingCache(get_embeddings(), model=DEPLOY_EMBED or "default")
+
+@lru_cache(maxsize=1)
+def get_vectorstore() -> Chroma:
+    """영구 Chroma 저장소 (프로세스당 한 번만 연다)"""
+    return Chroma(
+        collection_name=COLLECTION_NAME,
         persist_directory=VDB_DIR,
+        embedding_function=get_query_embeddings(),
     )
-    print("💖 벡터 DB 생성 완료")
-    return splits
 
-# Retriever 반환
+
+# 문서 로드 (임베딩/저장은 ingest.py가 한 번에 처리)
+SOURCE_EXTS = (".txt", ".pdf")
+
+def iter_source_files(data_dir: str = DATA_DIR) -> Iterator[str]:
+    """data/ 폴더의 TXT/PDF 파일 경로 (정렬된 순서, 하나씩)"""
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SOURCE_EXTS:
+                yield os.path.join(root, name)
+
+def load_file(path: str) -> Iterator[Document]:
+    """파일 하나 → Document (PDF는 페이지 단위로 하나씩 읽음)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".txt":
+        yield from TextLoader(path, encoding="utf-8").lazy_load()
+    elif ext == ".pdf":
+        yield from PyPDFLoader(path).lazy_load()
+
+def load_documents(data_dir: str = DATA_DIR) -> List[Document]:
+    """data/ 폴더의 TXT/PDF 문서를 읽어 Document 리스트로 반환"""
+    return [doc for path in iter_source_files(data_dir) for doc in load_file(path)]
+
+def count_tokens(texts: List[str]) -> int:
+    """cl100k_base 기준 토큰 수 (인코더를 못 받으면 글자 수로 근사)"""
+    try:
+        enc = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return sum(len(t) for t in texts)
+    return sum(len(enc.encode(t)) for t in texts)
+
+# Retriever 반환 (프로세스 전역 싱글톤)
+@lru_cache(maxsize=1)
 def get_retriever():
-    embeddings = AzureOpenAIEmbeddings(
-        model=os.getenv("AOAI_DEPLOY_EMBED_3_SMALL"),
-        azure_endpoint=os.getenv("AOAI_ENDPOINT"),
-        api_key=os.getenv("AOAI_API_KEY"),
-        api_version=os.getenv("OPENAI_API_VERSION", "2024-05-01-preview"),
-    )
+    return get_vectorstore().as_retriever(search_kwargs={"k": 3})
 
-    db = Chroma(
-        persist_directory=VDB_DIR,
-        embedding_function=embeddings,
-    )
-    return db.as_retriever(search_kwargs={"k": 3})
+def query_cache_stats() -> Dict[str, float]:
+    """질의 임베딩 캐시 적중/미스 현황"""
+    return get_query_embeddings().stats()
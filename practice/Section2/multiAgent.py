@@ -1,13 +1,14 @@
 import os
-#LangSmith 시각화
-os.environ["LANGSMITH_TRACING"] = "true"
-os.environ["LANGSMITH_API_KEY"] = "your_api_key"
+#LangSmith 시각화 (LANGSMITH_API_KEY가 설정된 경우에만 켬)
+if os.getenv("LANGSMITH_API_KEY"):
+    os.environ.setdefault("LANGSMITH_TRACING", "true")
 
-from typing import Literal
+from collections import Counter, OrderedDict
+from typing import List, Literal, Optional, Union
 from typing_extensions import TypedDict
 
 from langgraph.graph import MessagesState, StateGraph, START, END
-from langgraph.types import Command
+from langgraph.types import Command, Send
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
@@ -32,9 +33,10 @@ options = members + ["FINISH"]
 system_prompt = (
     "You are a supervisor tasked with managing a conversation between the"
     f" following workers: {members}. Given the following user request,"
-    " respond with the worker to act next. Each worker will perform a"
-    " task and respond with their results and status. When finished,"
-    " respond with FINISH."
+    " respond with the list of workers to act next. Workers whose tasks do"
+    " not depend on each other's results should be listed together; they"
+    " run in parallel. Each worker will perform a task and respond with"
+    " their results and status. When finished, respond with [\"FINISH\"]."
 )
 
 
@@ -42,27 +44,120 @@ system_prompt = (
 # Router 정의
 # ==========================
 class Router(TypedDict):
-    """Worker to route to next. If no workers needed, route to FINISH."""
-    next: Literal["nutritionist", "dietitian", "recipe", "FINISH"]
+    """Workers to route to next (run in parallel). If no workers needed, route to ["FINISH"]."""
+    next: List[Literal["nutritionist", "dietitian", "recipe", "FINISH"]]
 
 
 class State(MessagesState):
     next: str
 
 
+router_llm = llm.with_structured_output(Router)  # 매 hop마다 새로 만들지 않음
+
+# ==========================
+# Fast-path 라우팅 (LLM 호출 없이 결정)
+# ==========================
+MAX_HOPS = int(os.getenv("SUPERVISOR_MAX_HOPS", "6"))             # 요청당 worker 호출 상한
+MAX_PARALLEL_WORKERS = int(os.getenv("MAX_PARALLEL_WORKERS", "3"))  # 한 번에 동시에 도는 worker 수
+ROUTE_CACHE_SIZE = int(os.getenv("SUPERVISOR_ROUTE_CACHE", "256"))
+
+# 사용자 요청에 이 키워드가 있으면 해당 worker가 필요하다고 봄 (members 순서대로 실행)
+ROUTE_RULES = {
+    "nutritionist": ["영양", "칼로리", "kcal", "단백질", "나트륨", "탄수화물", "지방", "nutrition", "calorie"],
+    "dietitian": ["식단", "일주일", "요일", "월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일", "diet", "meal plan"],
+    "recipe": ["레시피", "요리", "만드는", "만들", "조리", "recipe", "cook"],
+}
+# worker 노드가 남기는 메시지 name → members 이름
+WORKER_NAMES = {"nutrition": "nutritionist", "diet": "dietitian", "recipe": "recipe"}
+
+route_cache: "OrderedDict[tuple, Union[str, List[str]]]" = OrderedDict()  # (사용자 요청들, 지금까지 거친 worker) → 다음 worker(들)
+route_stats = Counter()                                  # 결정 경로별 횟수: rule / cache / budget / llm
+
+
+def conversation_key(state: State) -> tuple:
+    """라우팅 결정에 쓰는 대화 상태: 사용자 요청 원문 + 이번 요청에서 거친 worker 순서"""
+    requests, visited = [], []
+    for m in state["messages"]:
+        name = WORKER_NAMES.get(getattr(m, "name", None))
+        if name:
+            visited.append(name)
+        elif getattr(m, "type", None) == "human":
+            requests.append(m.content)
+            visited = []  # 새 사용자 요청부터 다시 셈
+    return tuple(requests), tuple(visited)
+
+
+def rule_route(requests: tuple, visited: tuple) -> Optional[Union[str, List[str]]]:
+    """
+    키워드로 확실한 경우만 결정, 애매하면 None
+    - 첫 hop: 키워드가 여러 worker에 걸리면 그 worker들 → 한 번에 모두 (members 순서, 서로 독립이라 동시 실행)
+      하나만 걸리면 None → 같이 돌릴 worker가 더 있는지 LLM이 정함
+    - 이후 hop: 필요한데 아직 안 거친 worker들, 다 거쳤으면 FINISH
+    """
+    text = requests[-1].lower() if requests else ""
+    wanted = [m for m in members if any(k in text for k in ROUTE_RULES[m])]
+    if not wanted or (not visited and len(wanted) == 1):
+        return None
+    pending = [m for m in wanted if m not in visited]
+    return pending or "FINISH"
+
+
+def pick_workers(choice: List[str], visited: tuple) -> Union[str, List[str]]:
+    """LLM이 고른 목록 → 아직 안 거친 worker들 (members 순서, 중복 제거), 없으면 FINISH"""
+    workers = [m for m in members if m in choice and m not in visited]
+    return workers or "FINISH"
+
+
+def route(state: State) -> Union[str, List[str]]:
+    """다음 worker 목록 또는 FINISH — hop 상한 → 규칙 → 캐시 → LLM 순서로 결정"""
+    key = conversation_key(state)
+    requests, visited = key
+    budget = MAX_HOPS - len(visited)
+    if budget <= 0:
+        route_stats["budget"] += 1
+        return "FINISH"
+
+    goto = rule_route(requests, visited)
+    if goto is not None:
+        route_stats["rule"] += 1
+        return goto[:budget] if isinstance(goto, list) else goto
+
+    if key in route_cache:
+        route_cache.move_to_end(key)
+        route_stats["cache"] += 1
+        return route_cache[key]
+
+    messages = [{"role": "system", "content": system_prompt}] + state["messages"]
+    goto = pick_workers(router_llm.invoke(messages)["next"], visited)
+    if isinstance(goto, list):
+        goto = goto[:budget]
+    route_stats["llm"] += 1
+    route_cache[key] = goto
+    if len(route_cache) > ROUTE_CACHE_SIZE:
+        route_cache.popitem(last=False)
+    return goto
+
+
+def routing_report() -> dict:
+    total = sum(v for k, v in route_stats.items() if k != "fanout_workers")
+    avoided = total - route_stats["llm"]
+    return {**route_stats, "decisions": total, "llm_calls_avoided": avoided,
+            "avoided_ratio": round(avoided / total, 2) if total else 0.0}
+
+
 # ==========================
 # Supervisor Node
 # ==========================
 def supervisor_node(state: State) -> Command[Literal[*members, "__end__"]]:
-    messages = [
-                   {"role": "system", "content": system_prompt},
-               ] + state["messages"]
-    response = llm.with_structured_output(Router).invoke(messages)
-    goto = response["next"]
+    goto = route(state)
     if goto == "FINISH":
-        goto = END
+        return Command(goto=END, update={"next": END})
 
-    return Command(goto=goto, update={"next": goto})
+    # 고른 worker마다 같은 대화를 Send → 여러 개면 한 superstep에서 동시에 실행 (fan-out)
+    if len(goto) > 1:
+        route_stats["fanout_workers"] += len(goto)
+    return Command(goto=[Send(m, {"messages": state["messages"]}) for m in goto],
+                   update={"next": ",".join(goto)})
 
 
 # ==========================
@@ -163,13 +258,18 @@ builder.add_node("nutritionist", nutrition_node)
 builder.add_node("dietitian", diet_node)
 builder.add_node("recipe", recipe_node)
 graph = builder.compile()
+RECURSION_LIMIT = 2 * MAX_HOPS + 4  # supervisor ↔ worker 왕복 + 여유 (hop 상한이 먼저 걸림)
+# fan-out된 worker들은 같은 superstep에서 스레드 풀로 동시에 실행 → 지연은 가장 느린 worker 기준.
+# 결과 메시지는 Send 순서(= members 순서)대로 messages에 합쳐져 실행마다 같은 순서.
+RUN_CONFIG = {"recursion_limit": RECURSION_LIMIT, "max_concurrency": MAX_PARALLEL_WORKERS}
 
 # ==========================
 # 실행 예시
 # ==========================
 print("🍽️ 식단 플래너 실행 결과\n")
 
-for step in graph.stream({"messages": [("user", "나의 일주일 식단이 궁금해")]}, subgraphs=True):
+for step in graph.stream({"messages": [("user", "나의 일주일 식단이 궁금해")]},
+                         RUN_CONFIG, subgraphs=True):
     if isinstance(step, tuple) and len(step) == 2:
         node, state = step
         if (node):
@@ -199,3 +299,5 @@ for step in graph.stream({"messages": [("user", "나의 일주일 식단이 궁
     else:
         print("📌 Supervisor 단계:", step)
         print("-" * 50)
+
+print("🧭 라우팅 통계:", routing_report())
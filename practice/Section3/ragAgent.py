@@ -1,67 +1,159 @@
 # 지금까지 배운 RAG 기법을 자유롭게 활용하여 나만의 에이전트를 만들어보세요
 # 정보보안기사 요약집 RAG Agent
+#
+# 실행:
+#   python ragAgent.py                       # 대화형 (빈 줄 / q / exit 로 종료)
+#   python ragAgent.py --questions qs.txt    # 파일의 질문(한 줄에 하나, #으로 시작하면 무시)을 차례로 답변
+#
+# 임베딩은 처음 한 번만: PDF 내용 해시 + splitter 설정이 같으면 저장된 FAISS 인덱스를 그대로 읽음
 
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import AzureOpenAIEmbeddings, AzureChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain.chains import RetrievalQA
 
-# pdf 로드
-try :
-    loader = PyMuPDFLoader("정보보안기사 필기 요약(합본).pdf")
-    docs = loader.load()
-except Exception as e:
-    print(f"pdf 로드 중 오류 발생: {e}")
-    exit(1)
-
-# pdf 텍스트가 잘 뽑히는지 먼저 확인
-# print(len(docs), "pages loaded")
-# print(docs[0].page_content[:300])
-
-# 텍스트 splitter
-text_splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=500,  # 한 덩어리 최대 길이
-                    chunk_overlap=100 # 덩어리 간 중복
-                )
-
-# Splitter 실행
-splits = text_splitter.split_documents(docs)
-# print(f"총 {len(splits)} 개의 청크로 분할")
-# print(splits[0].page_content[:300])
-
-
-# Indexing (Vector DB)
-embeddings = AzureOpenAIEmbeddings(
-    model="text-embedding-3-small",
-    api_key=os.getenv("AOAI_API_KEY"),
-    azure_endpoint=os.getenv("AOAI_ENDPOINT")
-)
-
-vectorstore = FAISS.from_documents(splits, embeddings)
-
-# Retriever
-# retriever = vectorstore.as_retriever()
-
-# 검색 파라미터 최적화 MMR
-retriever = vectorstore.as_retriever(search_type="mmr", search_kwargs={"k": 5, "lambda_mult": 0.7})
-
-# LLM + QA 체인
-llm = AzureChatOpenAI(
-    model="gpt-4o-mini",    # or os.getenv("AOAI_DEPLOY_GPT4O_MINI")
-    api_key=os.getenv("AOAI_API_KEY"),
-    azure_endpoint=os.getenv("AOAI_ENDPOINT"),
-    api_version="2024-02-01"
-)
-qa = RetrievalQA.from_chain_type(llm, retriever=retriever)
-
-# test
-# query = "대칭키와 비대칭키의 차이를 설명해줘"
-query = input("질문을 입력하세요: ")
-
-result = qa.run(query)
-print("💖 ---질문--- 💖 :", query)
-print("\n🫧 ---답변 요약--- 🫧")
-for line in result.splitlines():
-    print(line)
\ No newline at end of file
+PDF_PATH = os.getenv("RAG_PDF_PATH", "정보보안기사 필기 요약(합본).pdf")
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "faiss_ragagent")  # 인덱스 저장 위치
+CHUNK_SIZE = 500     # 한 덩어리 최대 길이
+CHUNK_OVERLAP = 100  # 덩어리 간 중복
+EMBED_MODEL = "text-embedding-3-small"
+
+
+def file_hash(path: str) -> str:
+    """PDF 내용 해시 (파일 이름/수정 시각이 아니라 내용이 같으면 같은 값)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def index_meta(pdf_path: str) -> dict:
+    """이 값이 저장된 인덱스의 meta.json과 같을 때만 재사용"""
+    return {
+        "pdf_sha256": file_hash(pdf_path),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embed_model": EMBED_MODEL,
+    }
+
+
+def build_index(pdf_path: str, embeddings) -> FAISS:
+    # pdf 로드
+    try :
+        loader = PyMuPDFLoader(pdf_path)
+        docs = loader.load()
+    except Exception as e:
+        print(f"pdf 로드 중 오류 발생: {e}")
+        sys.exit(1)
+
+    # pdf 텍스트가 잘 뽑히는지 먼저 확인
+    # print(len(docs), "pages loaded")
+    # print(docs[0].page_content[:300])
+
+    # 텍스트 splitter
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    # Splitter 실행
+    splits = text_splitter.split_documents(docs)
+    print(f"총 {len(splits)} 개의 청크로 분할 → 임베딩")
+
+    # Indexing (Vector DB)
+    return FAISS.from_documents(splits, embeddings)
+
+
+def load_or_build_index(pdf_path: str, index_dir: str, embeddings) -> FAISS:
+    meta_path = os.path.join(index_dir, "meta.json")
+    try:
+        meta = index_meta(pdf_path)
+    except OSError as e:
+        print(f"pdf 로드 중 오류 발생: {e}")
+        sys.exit(1)
+
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f) == meta:
+                # index.pkl 은 이 스크립트가 직접 저장한 파일만 읽음
+                return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        print("PDF 또는 splitter 설정이 바뀜 → 인덱스를 다시 만듭니다.")
+
+    vectorstore = build_index(pdf_path, embeddings)
+    vectorstore.save_local(index_dir)
+    with open(meta_path, "w", encoding="utf-8") as f:  # 인덱스 저장이 끝난 뒤에 기록 (중간에 죽으면 다음 실행에 재생성)
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return vectorstore
+
+
+def ask(qa, query: str):
+    start = time.perf_counter()
+    result = qa.invoke({"query": query})["result"]
+    print("💖 ---질문--- 💖 :", query)
+    print("\n🫧 ---답변 요약--- 🫧")
+    for line in result.splitlines():
+        print(line)
+    print(f"\n⏱️ {time.perf_counter() - start:.1f}s")
+    print("-" * 50)
+
+
+def read_questions(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="정보보안기사 요약집 RAG Agent")
+    parser.add_argument("--questions", help="질문 파일 (한 줄에 하나)")
+    args = parser.parse_args()
+
+    embeddings = AzureOpenAIEmbeddings(
+        model=EMBED_MODEL,
+        api_key=os.getenv("AOAI_API_KEY"),
+        azure_endpoint=os.getenv("AOAI_ENDPOINT")
+    )
+
+    start = time.perf_counter()
+    vectorstore = load_or_build_index(PDF_PATH, INDEX_DIR, embeddings)
+    print(f"📚 인덱스 준비 완료: {vectorstore.index.ntotal}개 청크, {time.perf_counter() - start:.1f}s\n")
+
+    # Retriever
+    # retriever = vectorstore.as_retriever()
+
+    # 검색 파라미터 최적화 MMR
+    retriever = vectorstore.as_retriever(search_type="mmr", search_kwargs={"k": 5, "lambda_mult": 0.7})
+
+    # LLM + QA 체인
+    llm = AzureChatOpenAI(
+        model="gpt-4o-mini",    # or os.getenv("AOAI_DEPLOY_GPT4O_MINI")
+        api_key=os.getenv("AOAI_API_KEY"),
+        azure_endpoint=os.getenv("AOAI_ENDPOINT"),
+        api_version="2024-02-01"
+    )
+    qa = RetrievalQA.from_chain_type(llm, retriever=retriever)
+
+    if args.questions:
+        for query in read_questions(args.questions):
+            ask(qa, query)
+        return
+
+    # test
+    # query = "대칭키와 비대칭키의 차이를 설명해줘"
+    while True:
+        try:
+            query = input("질문을 입력하세요 (종료: 빈 줄/q): ").strip()
+        except EOFError:
+            break
+        if query.lower() in ("", "q", "quit", "exit"):
+            break
+        ask(qa, query)
+
+
+if __name__ == "__main__":
+    main()